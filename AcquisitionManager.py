@@ -0,0 +1,199 @@
+#  Concurrent acquisition of several ThorLabs devices
+#
+#  2026.10.18 v1.0
+#             v1.1 rows stamped with the measured times, add_device()
+#                  set_period()
+#
+#  Every device is polled by its own thread on a SampleClock; all clocks
+#  share the same start and period, so tick k of every device is scheduled
+#  at start + k*period.  The values of tick k are merged into one row of
+#  `channel` (a SampleChannel with one column per device quantity) that
+#  recorders and viewers read like the single device stream.  A row is
+#  published as soon as every device has passed its tick; a device lagging
+#  more than max_lag ticks (or one that failed) gets NaN in that row.
+#  The time of a row is the mean of the times its devices were read at.
+#  The first PM100USB gives the 'power' and 'temp' columns, so the merged
+#  rows can be used where the records of one PM100USB are expected.
+#
+#      manager = AcquisitionManager(period=0.05)
+#      manager.add_device('/dev/usbtmc0')   # model from the device list
+#      manager.add_pm100usb('/dev/usbtmc1')
+#      manager.add_tsp01('/dev/usbtmc2')
+#      manager.start()
+#
+import math
+import time
+import threading
+import numpy as np
+import ThorlabUSBTMC as thorlabs
+from SampleChannel import SampleChannel
+from SampleClock import SampleClock
+
+
+class DeviceSource:
+    "a device polled by the manager: its columns and how to read them"
+    def __init__(self, dev, fields, read):
+        self.dev = dev
+        self.fields = fields   # column names in the merged rows
+        self.read = read       # dev -> (time, monotonic time, values)
+        self.errors = 0
+        self.clock = None
+
+
+class AcquisitionManager:
+    def __init__(self, period=1.0, overrun='skip', max_lag=5, size=65536):
+        self.period = period
+        self.overrun = overrun
+        self.max_lag = max_lag
+        self.size = size
+        self.sources = []
+        self.measurement = False
+        self.channel = None
+        self.lock = threading.Lock()
+
+    def add(self, dev, fields, read):
+        self.sources.append(DeviceSource(dev, fields, read))
+
+    def add_device(self, dev_name):
+        "a PM100USB or a TSP01, after the model in the device list"
+        for info in thorlabs.list_devinfo():
+            if info[0] == dev_name:
+                if info[2] == 'TSP01':
+                    return self.add_tsp01(dev_name)
+                return self.add_pm100usb(dev_name)
+        raise IOError('no such device '+str(dev_name))
+
+    def add_pm100usb(self, dev_name):
+        dev = thorlabs.pm100usb()
+        if not dev.open(dev_name):
+            raise IOError('cannot open PM100USB '+str(dev_name))
+        if 'power' in self.fields():
+            k = len(self.sources)
+            fields = ['power'+str(k), 'temp'+str(k)]
+        else:
+            fields = ['power', 'temp']
+        self.add(dev, fields, self.pm100usb_values)
+        return dev
+
+    def pm100usb_values(self, dev):
+        tim, power, temp = dev.get_data()
+        return tim, dev.td_mono, (1000.0*power, temp) # mW like MeasureThorLabs
+
+    def tsp01_values(self, dev):
+        tim, temp0, temp1, temp2, humid = dev.get_data()
+        return tim, dev.td_mono, (temp0, temp1, temp2, humid)
+
+    def add_tsp01(self, dev_name):
+        dev = thorlabs.tsp01()
+        if not dev.open(dev_name):
+            raise IOError('cannot open TSP01 '+str(dev_name))
+        k = len(self.sources)
+        self.add(dev, ['temp'+str(k)+'_0', 'temp'+str(k)+'_1',
+                       'temp'+str(k)+'_2', 'humid'+str(k)],
+                 self.tsp01_values)
+        return dev
+
+    def fields(self):
+        return [name for s in self.sources for name in s.fields]
+
+    def prepare(self):
+        "the record layout and the channel of the merged rows"
+        self.dtype = np.dtype([('time', '<f8'), ('mono', '<f8')]
+                              + [(name, '<f4') for name in self.fields()])
+        if self.channel is None or self.channel.dtype != self.dtype:
+            self.channel = SampleChannel(self.size, self.dtype)
+        return self.dtype
+
+    def start(self):
+        if self.measurement:
+            return
+        self.prepare()
+        # pending rows: tick -> list of values (None until measured)
+        self.rows = {}
+        self.done = [-1]*len(self.sources)  # last tick of every device
+        self.next_tick = 0                  # next row to publish
+        self.start_mono = time.monotonic() + self.period
+        self.start_wall = time.time() + self.period
+        self.measurement = True
+        self.threads = []
+        for i,source in enumerate(self.sources):
+            th = threading.Thread(target=self.poll, args=(i, source))
+            th.daemon = True
+            self.threads.append(th)
+            th.start()
+
+    def stop(self):
+        if self.measurement:
+            self.measurement = False
+            for th in self.threads:
+                th.join()
+            with self.lock:
+                self.flush(all_rows=True)
+
+    def set_period(self, period):
+        "a running acquisition is restarted on the new period"
+        if period == self.period:
+            return
+        running = self.measurement
+        self.stop()
+        self.period = period
+        if running:
+            self.start()
+
+    def close(self):
+        self.stop()
+        for s in self.sources:
+            s.dev.close()
+        self.sources = []
+
+    def poll(self, i, source):
+        clock = SampleClock(self.period, self.overrun)
+        source.clock = clock
+        clock.start(self.start_mono - self.period) # first wait -> start
+        while self.measurement:
+            deadline = clock.wait()
+            tick = int(round((deadline - self.start_mono)/self.period))
+            try:
+                values = source.read(source.dev)
+            except (OSError, TimeoutError, ValueError):
+                source.errors += 1
+                values = None
+            self.put(i, tick, values)
+
+    def put(self, i, tick, values):
+        with self.lock:
+            if tick >= self.next_tick:
+                row = self.rows.get(tick)
+                if row is None:
+                    row = self.rows[tick] = [None]*len(self.sources)
+                row[i] = values
+            self.done[i] = tick
+            self.flush()
+
+    def flush(self, all_rows=False):
+        # publish the rows every device has passed (called with self.lock)
+        ready = min(self.done)
+        newest = max(self.done)
+        while self.rows and (all_rows or self.next_tick <= ready
+                             or newest - self.next_tick > self.max_lag):
+            tick = self.next_tick
+            row = self.rows.pop(tick, None)
+            self.next_tick = tick + 1
+            if row is None:
+                continue   # skipped by every device
+            measured = [v for v in row if v is not None]
+            if measured:
+                values = [sum(v[0] for v in measured)/len(measured),
+                          sum(v[1] for v in measured)/len(measured)]
+            else: # no device could be read: the scheduled time
+                values = [self.start_wall + tick*self.period,
+                          self.start_mono + tick*self.period]
+            for source,v in zip(self.sources, row):
+                if v is None:
+                    values += [math.nan]*len(source.fields)
+                else:
+                    values += list(v[2])
+            self.channel.publish(*values)
+
+    def timing(self):
+        return [s.clock.statistics() if s.clock else {} for s in self.sources]
@@ -0,0 +1,152 @@
+#  Binary data file of the measured data
+#
+#  2026.10.18 v1.0
+#             v1.1 statistics of the recording in the metadata
+#
+#  File layout
+#    magic 'PM100BIN', uint32 version, uint32 data offset (little endian)
+#    JSON metadata (header lines, device, sensor, WL, AVE, BW, PERIOD,
+#    record fields, statistics written at the end), padded with spaces up
+#    to the data offset
+#    fixed size records: float64 time, float64 monotonic time,
+#    float32 power, float32 temp (the fields are listed in the metadata)
+#
+#  BinaryReader maps the records and finds time ranges with a sparse
+#  index of every `step`-th timestamp and a binary search inside the
+#  selected block, so only a few pages of a large file are touched.
+#
+import os
+import json
+import struct
+import numpy as np
+from SampleStore import record_dtype
+
+magic = b'PM100BIN'
+version = 1
+header_size = 4096      # data offset; the JSON part may grow in blocks
+
+
+class BinaryFormat:
+    "writer used by DataRecorder (fmt='binary')"
+    def __init__(self, outFile, dtype=record_dtype):
+        self.outFile = outFile
+        self.dtype = dtype
+
+    def write_header(self, header, meta={}, stats=()):
+        self.meta = dict(meta)
+        self.meta['header'] = list(header)
+        self.meta['fields'] = [[name, self.dtype[name].str]
+                               for name in self.dtype.names]
+        # filled in by write_stats when the recording ends
+        self.meta['stats'] = {name: None for name in stats}
+        self.offset = write_header(self.outFile, self.meta,
+                                   reserve=512*len(self.meta['stats']))
+
+    def write_stats(self, results):
+        self.meta['stats'] = results
+        pos = self.outFile.tell()
+        self.outFile.seek(0)
+        try:
+            write_header(self.outFile, self.meta, offset=self.offset)
+        except ValueError:  # more than reserved: keep the old header
+            pass
+        self.outFile.seek(pos)
+
+    def write(self, index, rec):
+        if rec.dtype != self.dtype:
+            rec = rec.astype(self.dtype)
+        self.outFile.write(rec.tobytes())
+
+    def close(self):
+        pass
+
+
+def write_header(outFile, meta, reserve=0, offset=None):
+    """write the header with at least `reserve` bytes of padding, or (when
+    the data offset is given) in exactly offset bytes; returns the offset"""
+    text = json.dumps(meta).encode('utf-8')
+    if offset is None:
+        offset = header_size
+        while offset < 16 + len(text) + 1 + reserve:
+            offset += header_size
+    elif offset < 16 + len(text) + 1:
+        raise ValueError('header larger than the space reserved')
+    outFile.write(magic + struct.pack('<II', version, offset))
+    outFile.write(text + b'\n' + b' '*(offset - 16 - len(text) - 1))
+    return offset
+
+
+def read_header(inFile):
+    head = inFile.read(16)
+    if head[:8] != magic:
+        raise ValueError('not a PM100 binary data file')
+    ver, offset = struct.unpack('<II', head[8:16])
+    meta = json.loads(inFile.read(offset - 16).decode('utf-8'))
+    return ver, offset, meta
+
+
+class BinaryReader:
+    def __init__(self, filename, step=4096):
+        self.filename = filename
+        self.step = step
+        with open(filename, 'rb') as inFile:
+            self.version, self.offset, self.meta = read_header(inFile)
+        self.dtype = np.dtype([(name, fmt) for name,fmt in self.meta['fields']])
+        self.records = None
+        self.n = 0
+        self.refresh()
+
+    def refresh(self):
+        "map the records written so far (the file may still be growing)"
+        n = (os.path.getsize(self.filename) - self.offset)//self.dtype.itemsize
+        if n == self.n and self.records is not None:
+            return
+        self.n = n
+        if n > 0:
+            self.records = np.memmap(self.filename, dtype=self.dtype, mode='r',
+                                     offset=self.offset, shape=(n,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+        # sparse index: time of every step-th record
+        self.index = np.array(self.records['time'][::self.step])
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def header(self):
+        return self.meta.get('header', [])
+
+    @property
+    def stats(self):
+        "statistics of the recording (None while it is running)"
+        return self.meta.get('stats', {})
+
+    def search(self, tim, side='left'):
+        "record number where tim would be inserted (times are increasing)"
+        b = np.searchsorted(self.index, tim, side=side)
+        # the answer lies between index blocks b-1 and b
+        i0 = max(b-1, 0)*self.step
+        i1 = min(b*self.step + 1, self.n)
+        return i0 + int(np.searchsorted(self.records['time'][i0:i1], tim,
+                                        side=side))
+
+    def time_range(self, tmin, tmax):
+        "records with tmin <= time <= tmax, as a view of the mapped file"
+        return self.records[self.search(tmin):self.search(tmax, 'right')]
+
+    @property
+    def time(self):
+        return self.records['time']
+
+    @property
+    def power(self):
+        return self.records['power']
+
+    @property
+    def mono(self):
+        return self.records['mono']
+
+    @property
+    def temp(self):
+        return self.records['temp']
@@ -0,0 +1,191 @@
+#  Streaming recorder of the measured data
+#
+#  2026.10.18 v1.0 text format (same as the former 'Save Data')
+#                  binary format (BinaryRecord)
+#                  any record layout (e.g. merged multi-device rows)
+#                  statistics of the power in the header (RunningStats)
+#                  a write error (e.g. disk full) ends the recording and is
+#                  raised by stop()
+#
+#  The recorder runs in its own thread.  It first writes the history handed
+#  to it and then the samples read from a SampleChannel, in batches, and
+#  flushes/fsyncs the file every flush_interval seconds; a crash loses at
+#  most that much data.  The statistics of the power fields are computed
+#  while writing and filled into space reserved in the header at the end.
+#
+import os
+import time
+import threading
+import numpy as np
+from BinaryRecord import BinaryFormat
+from RunningStats import RunningStats
+from SampleStore import record_dtype
+
+
+class TextFormat:
+    """'# ' header lines, then 'index HH:MM:SS.ff power temp' per sample
+    (for other record layouts one column per field after the time)"""
+    formats = (('power', '%.4g'), ('temp', '%.1f'), ('humid', '%.1f'))
+
+    def __init__(self, outFile, dtype=record_dtype):
+        self.outFile = outFile
+        self.dtype = dtype
+        self.fields = [name for name in dtype.names
+                       if name not in ('time', 'mono')]
+        self.row = '%d %02d:%02d:%02d.%02d'
+        for name in self.fields:
+            fmt = '%.6g'
+            for prefix,f in self.formats:
+                if name.startswith(prefix):
+                    fmt = f
+            self.row += ' ' + fmt
+        self.row += '\n'
+
+    stats_width = 200  # characters reserved for each statistics line
+
+    def write_header(self, header, meta={}, stats=()):
+        for line in header:
+            self.outFile.write( ('# '+line+'\n').encode('ascii', 'replace'))
+        # filled in by write_stats when the recording ends
+        self.stats = list(stats)
+        self.stats_pos = self.outFile.tell()
+        for name in self.stats:
+            self.outFile.write( self.stats_line( name, None))
+        if self.dtype != record_dtype: # name the columns
+            line = '# index time ' + ' '.join(self.fields) + '\n'
+            self.outFile.write( line.encode('ascii'))
+
+    def stats_line(self, name, r):
+        line = '# STATS ' + name
+        if r is not None:
+            line += (' n={count} mean={mean:.6g} std={std:.4g} noise={rms_noise:.4g}'
+                     ' min={min:.6g} max={max:.6g} p2p={p2p:.4g}'
+                     ' drift={drift:.4g}/s').format(**r)
+        return (line[:self.stats_width].ljust(self.stats_width)+'\n').encode('ascii')
+
+    def write_stats(self, results):
+        pos = self.outFile.tell()
+        self.outFile.seek( self.stats_pos)
+        for name in self.stats:
+            self.outFile.write( self.stats_line( name, results.get(name)))
+        self.outFile.seek( pos)
+
+    def write(self, index, rec):
+        tim = rec['time']
+        n = len(tim)
+        if n == 0:
+            return
+        # local time of day, truncated to 1/100 s like strftime()[:11]
+        off0 = time.localtime(tim[0]).tm_gmtoff
+        off1 = time.localtime(tim[-1]).tm_gmtoff
+        if off0 == off1:
+            offset = off0
+        else: # DST change inside this batch
+            offset = np.array([time.localtime(t).tm_gmtoff for t in tim])
+        us = np.floor((tim + offset) * 1e6).astype(np.int64) % 86400000000
+        cs = us // 10000
+        cols = np.empty((n, 5+len(self.fields)), dtype=np.float64)
+        cols[:,0] = np.arange(index, index+n)
+        cols[:,1] = cs // 360000
+        cols[:,2] = (cs // 6000) % 60
+        cols[:,3] = (cs // 100) % 60
+        cols[:,4] = cs % 100
+        for i,name in enumerate(self.fields):
+            cols[:,5+i] = rec[name]
+        self.outFile.write( ((self.row*n) % tuple(cols.ravel())).encode('ascii'))
+
+    def close(self):
+        pass
+
+
+class DataRecorder:
+    formats = {'text': TextFormat, 'binary': BinaryFormat}
+
+    def __init__(self, filename, reader, header=(), history=(),
+                 fmt='text', interval=0.2, flush_interval=1.0, meta={}):
+        self.filename = filename
+        self.reader = reader      # ChannelReader of the new samples
+        self.header = header      # lines written after '# '
+        self.meta = meta          # measurement condition (binary format)
+        self.history = history    # list of record blocks written first
+        self.fmt = fmt
+        self.interval = interval              # seconds between batches
+        self.flush_interval = flush_interval  # seconds between fsync
+        self.count = 0            # samples written
+        self.recording = False
+        self.stats = {}           # field -> RunningStats of the samples
+        self.error = None         # exception that ended the recording
+        self.recorder_id = None
+
+    def stats_fields(self):
+        dtype = self.reader.channel.dtype
+        return [name for name in dtype.names if name.startswith('power')]
+
+    def start(self):
+        self.outFile = open( self.filename, 'wb')
+        self.writer = self.formats[self.fmt](self.outFile,
+                                             self.reader.channel.dtype)
+        self.stats = {name: RunningStats() for name in self.stats_fields()}
+        self.writer.write_header( self.header, self.meta, list(self.stats))
+        self.recording = True
+        self.recorder_id = threading.Thread(target=self.run)
+        self.recorder_id.daemon = True
+        self.recorder_id.start()
+
+    def stop(self):
+        "write the last batch and close; raises the error of the thread"
+        self.recording = False
+        if self.recorder_id is not None:
+            self.recorder_id.join()
+            self.recorder_id = None
+        if self.error is not None:
+            raise self.error
+
+    def write(self, rec):
+        self.writer.write( self.count, rec)
+        self.count += len(rec)
+        tim = rec['mono'] if 'mono' in rec.dtype.names else rec['time']
+        for name,stats in self.stats.items():
+            stats.extend( rec[name], tim)
+
+    def flush(self):
+        self.outFile.flush()
+        os.fsync( self.outFile.fileno())
+
+    def run(self):
+        try:
+            self.record()
+        except Exception as e:
+            self.error = e
+            self.recording = False
+            try:
+                self.outFile.close()
+            except OSError:
+                pass
+
+    def record(self):
+        for rec in self.history:
+            self.write( rec)
+        self.history = ()
+        last_flush = time.monotonic()
+        while True:
+            recording = self.recording # last batch after stop()
+            seq,rec = self.reader.read()
+            self.write( rec)
+            now = time.monotonic()
+            if not recording or now - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = now
+            if not recording:
+                break
+            time.sleep( self.interval)
+        self.writer.write_stats( self.results())
+        self.writer.close()
+        self.outFile.close()
+
+    def results(self):
+        return {name: stats.results() for name,stats in self.stats.items()}
+
+    @property
+    def lost(self):
+        return self.reader.lost
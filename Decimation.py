@@ -0,0 +1,126 @@
+#  Multi-resolution min/max envelope of the measured power
+#
+#  2026.10.18 v1.0
+#                  queries include the samples not merged into a bucket yet
+#
+#  Level 0 keeps min/max of every `base` samples, each next level merges
+#  `factor` buckets of the level below.  The levels are filled
+#  incrementally while the samples arrive, so any time range of the whole
+#  session can be drawn with about one bucket per pixel.  Since every
+#  bucket keeps both extremes, a single spike is never decimated away.
+#
+import numpy as np
+
+
+class EnvelopeLevel:
+    def __init__(self, size=1024):
+        self.n = 0
+        self.t0 = np.empty(size, dtype=np.float64)   # first time of bucket
+        self.t1 = np.empty(size, dtype=np.float64)   # last time of bucket
+        self.vmin = np.empty(size, dtype=np.float32)
+        self.vmax = np.empty(size, dtype=np.float32)
+
+    def extend(self, t0, t1, vmin, vmax):
+        m = len(t0)
+        if self.n + m > len(self.t0):
+            size = max(2*len(self.t0), self.n + m)
+            for name in ('t0', 't1', 'vmin', 'vmax'):
+                a = getattr(self, name)
+                b = np.empty(size, dtype=a.dtype)
+                b[:self.n] = a[:self.n]
+                setattr(self, name, b)
+        k = self.n
+        self.t0[k:k+m] = t0
+        self.t1[k:k+m] = t1
+        self.vmin[k:k+m] = vmin
+        self.vmax[k:k+m] = vmax
+        self.n = k + m
+
+
+class MinMaxPyramid:
+    def __init__(self, base=16, factor=4, levels=10):
+        self.base = base
+        self.factor = factor
+        self.nlevels = levels
+        self.clear()
+
+    def clear(self):
+        self.levels = [EnvelopeLevel() for i in range(self.nlevels)]
+        # samples (level 0) or buckets (upper levels) not merged yet
+        self.pending = [None]*self.nlevels
+        self.count = 0
+
+    def extend(self, tim, value):
+        tim = np.asarray(tim, dtype=np.float64)
+        value = np.asarray(value, dtype=np.float32)
+        self.count += len(tim)
+        # level 0 from the raw samples
+        p = self.pending[0]
+        if p is not None:
+            tim = np.concatenate((p[0], tim))
+            value = np.concatenate((p[1], value))
+        m = (len(tim)//self.base)*self.base
+        self.pending[0] = (tim[m:].copy(), value[m:].copy())
+        if m == 0:
+            return
+        t = tim[:m].reshape(-1, self.base)
+        v = value[:m].reshape(-1, self.base)
+        new = (t[:,0], t[:,-1], v.min(axis=1), v.max(axis=1))
+        self.levels[0].extend(*new)
+        # upper levels from the new buckets of the level below
+        for k in range(1, self.nlevels):
+            p = self.pending[k]
+            if p is not None:
+                new = tuple(np.concatenate((a, b)) for a,b in zip(p, new))
+            m = (len(new[0])//self.factor)*self.factor
+            self.pending[k] = tuple(a[m:].copy() for a in new)
+            if m == 0:
+                break
+            f = self.factor
+            new = (new[0][:m:f], new[1][f-1:m:f],
+                   new[2][:m].reshape(-1, f).min(axis=1),
+                   new[3][:m].reshape(-1, f).max(axis=1))
+            self.levels[k].extend(*new)
+
+    def select_level(self, tmin, tmax, npoints):
+        "the finest level with at most npoints buckets in [tmin, tmax]"
+        for k,lev in enumerate(self.levels):
+            i0 = np.searchsorted(lev.t1[:lev.n], tmin)
+            i1 = np.searchsorted(lev.t0[:lev.n], tmax, side='right')
+            if i1 - i0 <= npoints:
+                return k, i0, i1
+        return k, i0, i1
+
+    def tail(self, k):
+        """(t0, t1, vmin, vmax) of the newest samples not in a bucket of
+        level k yet: the pending buckets of the levels below, oldest first,
+        and the pending raw samples as one bucket."""
+        parts = [self.pending[j] for j in range(k, 0, -1)
+                 if self.pending[j] is not None and len(self.pending[j][0])]
+        p = self.pending[0]
+        if p is not None and len(p[0]):
+            parts.append((p[0][:1], p[0][-1:], p[1].min(keepdims=True),
+                          p[1].max(keepdims=True)))
+        if not parts:
+            return None
+        return tuple(np.concatenate(a) for a in zip(*parts))
+
+    def query(self, tmin, tmax, npoints):
+        """Envelope of [tmin, tmax] with at most ~npoints buckets as (x, y)
+        arrays: each bucket is drawn as a vertical stroke min->max."""
+        k, i0, i1 = self.select_level(tmin, tmax, npoints)
+        lev = self.levels[k]
+        t0, t1 = lev.t0[i0:i1], lev.t1[i0:i1]
+        vmin, vmax = lev.vmin[i0:i1], lev.vmax[i0:i1]
+        tail = self.tail(k)
+        if tail is not None:
+            keep = (tail[1] >= tmin) & (tail[0] <= tmax)
+            t0, t1, vmin, vmax = (np.concatenate((a, b[keep])) for a,b in
+                                  zip((t0, t1, vmin, vmax), tail))
+        x = np.empty(2*len(t0), dtype=np.float64)
+        y = np.empty(2*len(t0), dtype=np.float32)
+        x[0::2] = t0
+        x[1::2] = t1
+        y[0::2] = vmin
+        y[1::2] = vmax
+        return x, y
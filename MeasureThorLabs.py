@@ -2,77 +2,102 @@
 #
 #  2020.11.27 v1.0 Goro Nishimura
 #       12.15 v1.01 add recording flag
-import time
+#  2026.10.18 v1.1 history is kept in a SampleStore (numpy arrays)
+#                  samples are passed to consumers through a SampleChannel
+#                  streaming recorder
+#                  monotonic sample clock with overrun policy
+#                  reconnect after USB errors
+#                  PM100USBFollower: samples of a running pm100usb_daemon
+#                  sample stream on a local socket
+#                  running statistics of the power (RunningStats)
+#                  trigger with pre-trigger buffer (Trigger)
+#                  TSP01 measurement
+#                  PM100USBGroup: several devices polled in parallel
+import socket
 import threading
 import ThorlabUSBTMC as thorlabs
+from BinaryRecord import BinaryReader
+from SampleStream import StreamPublisher, StreamSubscriber, is_address
+from SampleClock import SampleClock
+from SampleStore import SampleStore, record_dtype, tsp01_dtype
+from RunningStats import RunningStats, SlidingMinMax
+from SampleChannel import SampleChannel
+from DataRecorder import DataRecorder
+from AcquisitionManager import AcquisitionManager
 
-class PM100USB(thorlabs.pm100usb):
-    def __init__(self):
-        super().__init__()
-        self.time = []
-        self.power = []
-        self.temp = []
-        self.maxmin_power = []
+# Measurement loop, sample channel, history and recorder shared by the
+# devices; the device class provides measure(), info() and info_header().
+class Measurement:
+    def init_measurement(self, dtype, capacity, spill_file):
+        # history: the newest `capacity` samples stay in memory,
+        # older chunks go to spill_file (or are dropped if None)
+        self.data = SampleStore(capacity, spill_file=spill_file, dtype=dtype)
+        # the measurement thread only publishes into the channel;
+        # the thread owning self.data fills it by update_data()
+        self.channel = SampleChannel(dtype=dtype)
+        self.data_reader = self.channel.reader()
+        self.measured = 0     # number of measure() calls, for the GUI refresh
         self.period = 1.0     # seconds
+        self.overrun = 'skip' # see SampleClock
+        self.clock = SampleClock( self.period, self.overrun)
+        self.num = 0          # samples left when the measurement stopped
         self.measurement = False
         self.recording = False
-        self.lock = threading.Lock()
-        self.init_data()
 
-    def open(self, dev_name=None):
-        if not self.active:
-            self.measurement = False
-            if super().open(dev_name):
-                self.active = True
+    def init_data(self):
+        self.data_reader.reset()
+        self.data.clear()
 
-    def close(self):
-        if self.active:
-            if self.measurement:
-                self.stopMeasurement()
-            super().close()
-            self.recording = False
-            self.measurement = False
+    def drain_channel(self):
+        # move the published samples into the history and return them;
+        # call it from the thread reading self.data (e.g. the GUI)
+        seq,rec = self.data_reader.read()
+        if len(rec):
+            self.data.extend(rec)
+        return rec
 
-    def measure(self):
-        if self.active:
-            tim,p,tmp = super().get_data()
-            p *= 1000.0
-            self.current_power = p
-            self.current_temp = tmp
-            if self.recording:
-                self.lock.acquire()
-                self.time.append(tim)
-                self.power.append(p)
-                self.temp.append(tmp)
-                self.lock.release()
-                
-            if p<self.maxmin_power[0]: # check minimum
-                self.maxmin_power[0] = p
-            if p>self.maxmin_power[1]: # check maximum
-                self.maxmin_power[1] = p
+    def update_data(self):
+        return len(self.drain_channel())
 
-    def init_data(self):
-        self.current_power = 0.0
-        self.current_temp = 25.0
-        self.lock.acquire()
-        self.time.clear()
-        self.power.clear()
-        self.temp.clear()
-        self.maxmin_power = [1e9,-1e9]
-        self.lock.release()
+    def start_recorder(self, filename, header=[], history=True, fmt='text'):
+        # writes the history (if history) and then streams the new samples
+        # to filename; call it from the thread owning self.data
+        self.update_data()
+        reader = self.channel.reader()
+        reader.seq = self.data_reader.seq # the first one not in self.data
+        if history:
+            blocks = self.data.snapshot()
+        else:
+            blocks = []
+        recorder = DataRecorder(filename, reader, header+self.info_header(),
+                                blocks, fmt, meta=self.info())
+        recorder.start()
+        return recorder
+
+    def start_publisher(self, address):
+        # serves the new samples on a local socket (see SampleStream)
+        publisher = StreamPublisher(self.channel, address, meta=self.info())
+        publisher.start()
+        return publisher
 
     def isActive(self):
         return self.active
 
     def timerMeasurement(self, num):
-        next_call = time.time()
+        # the first sample was taken by startMeasurement
+        self.clock = SampleClock( self.period, self.overrun)
         while self.measurement and num!=0:
+            self.clock.period = self.period # may be changed while measuring
+            self.clock.wait()
             self.measure()
             if num>0:
                 num -=1
-            next_call = next_call + self.period
-            time.sleep(next_call - time.time())
         self.measurement = False
+        self.num = num
+
+    def timing(self):
+        "achieved period and missed deadlines of the measurement"
+        return self.clock.statistics()
 
     def startMeasurement(self, num=1):
         if self.active:
@@ -99,3 +124,372 @@ class PM100USB(thorlabs.pm100usb):
             except NameError:
                 pass
 
+    def continueMeasurement(self):
+        "start again with the samples left when it was stopped"
+        if self.active and not self.measurement:
+            self.startMeasurement( self.num)
+
+
+class PM100USB(Measurement, thorlabs.pm100usb):
+    def __init__(self, capacity=1000000, spill_file=None):
+        super().__init__()
+        self.init_measurement(record_dtype, capacity, spill_file)
+        self.maxmin_power = []
+        self.stats = RunningStats(window=60.0) # of the power in self.data
+        # min/max of every measured power (recorded or not) in the window
+        self.recent = SlidingMinMax(self.stats.window)
+        self.trigger = None   # Trigger watching the samples
+        self.init_data()
+
+    def open(self, dev_name=None, reset=False):
+        if not self.active:
+            self.measurement = False
+            if super().open(dev_name, reset=reset):
+                self.active = True
+        return self.active
+
+    def close(self):
+        if self.active:
+            if self.measurement:
+                self.stopMeasurement()
+            super().close()
+            self.recording = False
+            self.measurement = False
+
+    def timerMeasurement(self, num):
+        super().timerMeasurement(num)
+        if self.trigger is not None: # stopped during a capture
+            self.trigger.flush()
+
+    def measure(self):
+        if not self.active and self.measurement:
+            self.reconnect() # after a USB error, see below
+        if self.active:
+            try:
+                tim,p,tmp = super().get_data()
+            except (OSError, ValueError):
+                # USB glitch or garbled reply: connect again and go on
+                # with the next sample
+                self.reconnect()
+                return
+            p *= 1000.0
+            self.current_power = p
+            self.current_temp = tmp
+            self.measured += 1
+            main = True
+            if self.trigger is not None: # sees every sample at once
+                self.trigger.feed(tim, self.td_mono, p, tmp)
+                main = self.trigger.main_sample(self.td_mono)
+            if self.recording and main:
+                self.channel.publish(tim, self.td_mono, p, tmp)
+
+            if p<self.maxmin_power[0]: # check minimum
+                self.maxmin_power[0] = p
+            if p>self.maxmin_power[1]: # check maximum
+                self.maxmin_power[1] = p
+            self.recent.append(p, self.td_mono)
+            self.recent_minmax = (self.recent.min, self.recent.max)
+
+    def init_data(self):
+        self.current_power = 0.0
+        self.current_temp = 25.0
+        super().init_data()
+        self.stats.clear()
+        self.maxmin_power = [1e9,-1e9]
+        self.recent.clear()
+        self.recent_minmax = None # read by the GUI thread
+
+    def update_data(self):
+        rec = self.drain_channel()
+        if len(rec):
+            self.stats.extend(rec['power'], rec['mono'])
+        return len(rec)
+
+    # measurement condition written at the top of the data files
+    def info(self):
+        return {'device': self.dev_name,
+                'device_info': list(self.device_info),
+                'sensor_info': list(self.sensor_info),
+                'WL': self.wavelength,
+                'AVE': self.average,
+                'BW': self.bw,
+                'PERIOD': self.period}
+
+    def info_header(self):
+        return [self.dev_name+' ('+','.join(self.device_info)+')',
+                ','.join(self.sensor_info),
+                'WL:'+str(self.wavelength) \
+                +' AVE:'+str(self.average) \
+                +' BW:'+str(self.bw) \
+                +' PERIOD:'+str(self.period)]
+
+    # zero-copy views of the samples in memory
+    @property
+    def time(self):
+        return self.data.time
+
+    @property
+    def power(self):
+        return self.data.power
+
+    @property
+    def temp(self):
+        return self.data.temp
+
+
+
+# TSP01 temperature/humidity measurement with its own period, history and
+# recorder.  It runs in its own thread on its own device, so it overlaps
+# with the PM100USB acquisition instead of waiting behind it.
+class TSP01(Measurement, thorlabs.tsp01):
+    def __init__(self, capacity=100000, spill_file=None):
+        super().__init__()
+        self.init_measurement(tsp01_dtype, capacity, spill_file)
+        self.period = 10.0    # seconds; the environment changes slowly
+        self.init_data()
+
+    def open(self, dev_name=None, reset=False):
+        if not self.active:
+            self.measurement = False
+            super().open(dev_name, reset=reset)
+        return self.active
+
+    def close(self):
+        if self.active:
+            if self.measurement:
+                self.stopMeasurement()
+            super().close()
+            self.recording = False
+            self.measurement = False
+
+    def measure(self):
+        if not self.active and self.measurement:
+            self.reconnect()
+        if self.active:
+            try:
+                tim,t0,t1,t2,humid = super().get_data()
+            except (OSError, ValueError):
+                self.reconnect()
+                return
+            self.current = (t0, t1, t2, humid)
+            self.measured += 1
+            if self.recording:
+                self.channel.publish(tim, self.td_mono, t0, t1, t2, humid)
+
+    def init_data(self):
+        self.current = (0.0, 0.0, 0.0, 0.0)
+        super().init_data()
+
+    def info(self):
+        return {'device': self.dev_name,
+                'device_info': list(self.device_info),
+                'PERIOD': self.period}
+
+    def info_header(self):
+        return [self.dev_name+' ('+','.join(self.device_info)+')',
+                'PERIOD:'+str(self.period)]
+
+
+# The samples recorded by another process (pm100usb_daemon) presented like
+# a measurement: its binary data file is polled every period, or its
+# sample stream ('unix:/path', 'tcp:port') is read, and the new records
+# are published to the channel, so the GUI, the recorder etc. work as with
+# the device.  The device is not touched.
+class PM100USBFollower(PM100USB):
+    def open(self, dev_name=None, reset=False):
+        if not self.active:
+            self.measurement = False
+            self.init_data()
+            self.reader = self.stream = None
+            try:
+                if is_address(dev_name):
+                    self.stream = StreamSubscriber(dev_name)
+                    meta = self.stream.meta
+                else:
+                    self.reader = BinaryReader(dev_name)
+                    meta = self.reader.meta
+            except (OSError, ValueError, EOFError):
+                # no such file, not a PM100 binary file, nobody listening
+                return False
+            if self.reader is not None:
+                # the samples recorded so far go straight to the history
+                rec = self.reader.records
+                self.data.extend(rec)
+                self.stats.extend(rec['power'], rec['mono'])
+                self.pos = self.reader.n   # records of the file already read
+            self.dev_name = dev_name
+            self.device_info = meta.get('device_info', [])
+            self.sensor_info = meta.get('sensor_info', [])
+            self.wavelength = meta.get('WL', self.wavelength)
+            self.average = meta.get('AVE', self.average)
+            self.bw = meta.get('BW', self.bw)
+            self.period = meta.get('PERIOD', self.period)
+            self.active = True
+        return self.active
+
+    def close(self):
+        if self.active:
+            if self.measurement:
+                self.stopMeasurement()
+            self.active = False
+            self.recording = False
+            self.reader = None
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+
+    def reconnect(self):
+        return self.active
+
+    def apply_config(self, config=None):
+        return {}   # owned by the recording process
+
+    def read_new(self):
+        if self.stream is not None:
+            self.stream.sock.settimeout(self.period)
+            try:
+                seq,rec = self.stream.read()
+            except socket.timeout:
+                return None
+            except (EOFError, OSError):
+                self.measurement = False # the publisher has stopped
+                return None
+            return rec
+        self.reader.refresh()
+        rec = self.reader.records[self.pos:self.reader.n]
+        self.pos = self.reader.n
+        return rec
+
+    def measure(self):
+        if self.active:
+            rec = self.read_new()
+            if rec is None or len(rec) == 0:
+                return
+            if self.recording:
+                for r in rec:
+                    self.channel.publish(*r)
+            power = rec['power']
+            self.current_power = float(power[-1])
+            self.current_temp = float(rec['temp'][-1])
+            self.maxmin_power[0] = min(self.maxmin_power[0], float(power.min()))
+            self.maxmin_power[1] = max(self.maxmin_power[1], float(power.max()))
+            ok = power == power # not NaN (a failed head of PM100USBGroup)
+            self.recent.extend(power[ok].tolist(), rec['mono'][ok].tolist())
+            if self.recent.count:
+                self.recent_minmax = (self.recent.min, self.recent.max)
+            self.measured += 1
+
+
+# Several PM100USB heads and TSP01 sensors polled in parallel by an
+# AcquisitionManager, presented like one PM100USB: the merged rows take
+# the place of its samples, so the graph, the statistics and the recorder
+# get all the columns.  'power' and 'temp' are those of the first PM100USB.
+class PM100USBGroup(PM100USBFollower):
+    def __init__(self, devices, capacity=1000000, spill_file=None):
+        super().__init__(capacity, spill_file)
+        self.devices = list(devices)  # usbtmc device names
+        self.capacity = capacity
+        self.spill_file = spill_file
+        self.manager = None
+
+    # a new period also restarts the polling of the devices on it
+    @property
+    def period(self):
+        return self._period
+
+    @period.setter
+    def period(self, period):
+        self._period = period
+        manager = getattr(self, 'manager', None)
+        if manager is not None:
+            manager.set_period(period)
+
+    def open(self, dev_name=None, reset=False):
+        if not self.active:
+            manager = AcquisitionManager(self.period, self.overrun)
+            try:
+                for name in self.devices:
+                    manager.add_device(name)
+                if 'power' not in manager.fields():
+                    raise IOError('no PM100USB in '+','.join(self.devices))
+            except IOError:
+                manager.close()
+                return False
+            dtype = manager.prepare()
+            if dtype != self.data.dtype:
+                # the first open: the layout of the merged rows is known
+                # now; later opens keep the store and the channel
+                period = self.period
+                self.data.close()
+                self.init_measurement(dtype, self.capacity, self.spill_file)
+                self.period = period
+            self.init_data()
+            self.manager = manager
+            self.rows = manager.channel.reader()
+            main = next(s.dev for s in manager.sources
+                        if isinstance(s.dev, thorlabs.pm100usb))
+            self.dev_name = ','.join(self.devices)
+            self.device_info = main.device_info
+            self.sensor_info = main.sensor_info
+            self.wavelength = main.wavelength
+            self.average = main.average
+            self.bw = main.bw
+            self.active = True
+        return self.active
+
+    def close(self):
+        if self.active:
+            if self.measurement:
+                self.stopMeasurement()
+            self.manager.close()
+            self.manager = None
+            self.active = False
+            self.recording = False
+
+    def pm100usb_sources(self):
+        return [s.dev for s in self.manager.sources
+                if isinstance(s.dev, thorlabs.pm100usb)]
+
+    def apply_config(self, config=None):
+        # the same settings for every head; a failing head does not keep
+        # the others from being configured
+        diff = {}
+        failed = []
+        for dev in self.pm100usb_sources():
+            try:
+                diff = dev.apply_config(config) or diff
+            except OSError as e:  # unplugged or busy (TimeoutError)
+                failed.append(dev.dev_name+': '+str(e))
+        main = self.pm100usb_sources()[0]
+        self.wavelength = main.wavelength
+        self.average = main.average
+        self.bw = main.bw
+        if failed:
+            raise OSError('not configured: '+'; '.join(failed))
+        return diff
+
+    def info(self):
+        meta = super().info()
+        meta['devices'] = [[s.dev.dev_name, s.fields]
+                           for s in self.manager.sources]
+        return meta
+
+    def info_header(self):
+        return super().info_header() \
+            + [s.dev.dev_name+': '+' '.join(s.fields)
+               for s in self.manager.sources]
+
+    def startMeasurement(self, num=1):
+        if self.active and not self.manager.measurement:
+            self.manager.period = self.period
+            self.manager.start()
+        super().startMeasurement(num)
+
+    def stopMeasurement(self):
+        super().stopMeasurement()
+        if self.manager is not None:
+            self.manager.stop()
+
+    def read_new(self):
+        seq,rec = self.rows.read()
+        return rec
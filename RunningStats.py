@@ -0,0 +1,166 @@
+#  Incremental statistics of the measured data
+#
+#  2026.10.18 v1.0 sliding window min/max
+#                  running mean/std/noise/peak-to-peak/drift
+#
+import math
+from collections import deque
+import numpy as np
+
+
+class SlidingMinMax:
+    """min/max over a sliding window with monotonic deques, O(1) amortized
+    per value.  The window holds the values whose position is within
+    `length` of the newest one; the position is the sample count unless
+    given (e.g. a timestamp for a window in seconds)."""
+    def __init__(self, length):
+        self.length = length
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self.minq = deque()  # (pos, value), values increasing
+        self.maxq = deque()  # (pos, value), values decreasing
+
+    def append(self, value, pos=None):
+        if pos is None:
+            pos = self.count
+        self.count += 1
+        minq = self.minq
+        while minq and minq[-1][1] >= value:
+            minq.pop()
+        minq.append((pos, value))
+        maxq = self.maxq
+        while maxq and maxq[-1][1] <= value:
+            maxq.pop()
+        maxq.append((pos, value))
+        # forget values out of the window
+        limit = pos - self.length
+        while minq[0][0] <= limit:
+            minq.popleft()
+        while maxq[0][0] <= limit:
+            maxq.popleft()
+
+    def extend(self, values, pos=None):
+        if pos is None:
+            for v in values:
+                self.append(v)
+        else:
+            for v,p in zip(values, pos):
+                self.append(v, p)
+
+    @property
+    def min(self):
+        return self.minq[0][1] if self.minq else None
+
+    @property
+    def max(self):
+        return self.maxq[0][1] if self.maxq else None
+
+
+class RunningStats:
+    """Statistics of a signal updated with every sample (or batch) in
+    constant time per sample: count, mean and standard deviation (Welford,
+    batches merged with Chan's formula), relative RMS noise, session
+    min/max and peak-to-peak, min/max over the last `window` seconds and
+    the drift (least squares slope against time, per second)."""
+    def __init__(self, window=60.0):
+        self.window = window
+        self.minmax = SlidingMinMax(window)
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0       # sum of squared deviations of the values
+        self.t0 = None      # times are taken relative to the first one
+        self.tmean = 0.0
+        self.tm2 = 0.0      # sum of squared deviations of the times
+        self.cov = 0.0      # sum of products of both deviations
+        self.min = math.inf
+        self.max = -math.inf
+        self.minmax.clear()
+
+    def append(self, value, t):
+        if self.t0 is None:
+            self.t0 = t
+        x = t - self.t0
+        self.count += 1
+        n = self.count
+        dv = value - self.mean
+        dx = x - self.tmean
+        self.mean += dv/n
+        self.tmean += dx/n
+        self.m2 += dv*(value - self.mean)
+        self.tm2 += dx*(x - self.tmean)
+        self.cov += dx*(value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.minmax.append(value, t)
+
+    def extend(self, values, t):
+        "a batch of samples (numpy arrays of values and times)"
+        k = len(values)
+        if k == 0:
+            return
+        values = np.asarray(values, dtype=np.float64)
+        ok = np.isfinite(values)  # e.g. NaN of a missing device
+        if not ok.all():
+            values, t = values[ok], np.asarray(t)[ok]
+            k = len(values)
+            if k == 0:
+                return
+        if self.t0 is None:
+            self.t0 = float(t[0])
+        x = np.asarray(t, dtype=np.float64) - self.t0
+        bmean = float(values.mean())
+        btmean = float(x.mean())
+        dv = values - bmean
+        dx = x - btmean
+        bm2 = float(dv @ dv)
+        btm2 = float(dx @ dx)
+        bcov = float(dx @ dv)
+        # merge with the statistics so far
+        n = self.count + k
+        d = bmean - self.mean
+        e = btmean - self.tmean
+        f = self.count*k/n
+        self.m2 += bm2 + d*d*f
+        self.tm2 += btm2 + e*e*f
+        self.cov += bcov + d*e*f
+        self.mean += d*k/n
+        self.tmean += e*k/n
+        self.count = n
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        # only the samples inside the window matter for its min/max
+        i = np.searchsorted(t, t[-1] - self.window, side='right')
+        self.minmax.extend(values[i:].tolist(), t[i:].tolist())
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2/(self.count-1)) if self.count > 1 else 0.0
+
+    @property
+    def rms_noise(self):
+        "standard deviation relative to the mean"
+        return self.std/abs(self.mean) if self.mean else 0.0
+
+    @property
+    def p2p(self):
+        return self.max - self.min if self.count else 0.0
+
+    @property
+    def drift(self):
+        "slope of the least squares line, per second"
+        return self.cov/self.tm2 if self.tm2 > 0 else 0.0
+
+    def results(self):
+        return {'count': self.count, 'mean': self.mean, 'std': self.std,
+                'rms_noise': self.rms_noise, 'min': self.min if self.count else 0.0,
+                'max': self.max if self.count else 0.0, 'p2p': self.p2p,
+                'window': self.window,
+                'window_min': self.minmax.min, 'window_max': self.minmax.max,
+                'drift': self.drift}
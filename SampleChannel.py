@@ -0,0 +1,90 @@
+#  Single-producer sample channel between the acquisition thread and
+#  its consumers (graph, recorder, statistics)
+#
+#  2026.10.18 v1.0
+#
+#  The producer writes each sample into a fixed ring and then advances the
+#  sequence number; it never waits for anybody.  Every consumer owns a
+#  ChannelReader holding the sequence number of the next sample it wants.
+#  A reader copies the published range out of the ring and checks the
+#  sequence number again afterwards: slots the producer may have reused in
+#  the meantime are discarded and counted in `lost`, so what a reader gets
+#  is always consistent.
+#
+import numpy as np
+from SampleStore import record_dtype
+
+
+class SampleChannel:
+    def __init__(self, size=65536, dtype=record_dtype):
+        bits = max(int(size)-1, 1).bit_length()
+        self.size = 1 << bits    # power of two, so the slot is seq & mask
+        self.mask = self.size - 1
+        self.dtype = dtype
+        self.buf = np.zeros(self.size, dtype=dtype)
+        self.seq = 0   # number of samples published so far
+
+    def publish(self, *values):
+        "called from the producer thread only; values in field order"
+        seq = self.seq
+        self.buf[seq & self.mask] = values
+        self.seq = seq + 1   # make the sample visible to the readers
+
+    def reader(self, from_start=False):
+        return ChannelReader(self, from_start)
+
+    def _copy(self, start, stop):
+        # copy samples [start, stop) out of the ring
+        i = start & self.mask
+        j = i + (stop - start)
+        if j <= self.size:
+            return self.buf[i:j].copy()
+        return np.concatenate((self.buf[i:], self.buf[:j-self.size]))
+
+    def snapshot(self, n=None):
+        "consistent copy of (at most) the newest n samples"
+        reader = ChannelReader(self)
+        if n is None or n > self.size:
+            n = self.size
+        reader.seq = max(self.seq - n, 0)
+        return reader.read()
+
+
+class ChannelReader:
+    def __init__(self, channel, from_start=False):
+        self.channel = channel
+        if from_start:
+            self.seq = max(channel.seq - channel.size, 0)
+        else:
+            self.seq = channel.seq   # next sample to read
+        self.lost = 0                # samples overwritten before being read
+
+    def pending(self):
+        return self.channel.seq - self.seq
+
+    def reset(self):
+        "skip everything published so far"
+        self.seq = self.channel.seq
+
+    def read(self, max_n=None):
+        """Return (seq, records) with the samples published since the last
+        read; seq is the sequence number of the first one."""
+        ch = self.channel
+        head = ch.seq
+        start = self.seq
+        if head - start > ch.size - 1:
+            self.lost += head - (ch.size-1) - start
+            start = head - (ch.size-1)
+        if max_n is not None and head - start > max_n:
+            head = start + max_n
+        rec = ch._copy(start, head)
+        # the slot of sample s is reused by sample s+size; the sample being
+        # written now may already be half stored, so keep only s > seq-size
+        overrun = ch.seq - ch.size + 1 - start
+        if overrun > 0:
+            overrun = min(overrun, head - start)
+            self.lost += overrun
+            start += overrun
+            rec = rec[overrun:]
+        self.seq = head
+        return start, rec
@@ -0,0 +1,79 @@
+#  Periodic sample clock based on the monotonic clock
+#
+#  2026.10.18 v1.0
+#
+#  Deadlines are start + k*period on time.monotonic(), so they do not
+#  drift and are not disturbed by NTP steps of the wall clock.  When a
+#  sample overruns its period the clock follows `policy`:
+#    'skip'     take the current deadline late, drop the ones passed
+#               meanwhile and stay on the grid
+#    'catchup'  run the missed samples at once, then continue on the grid
+#    'stretch'  start a new grid from now (no burst, no gap accounting)
+#  Every deadline found already passed is counted in `missed`.
+#
+import math
+import time
+
+
+class SampleClock:
+    policies = ('skip', 'catchup', 'stretch')
+
+    def __init__(self, period, policy='skip'):
+        if policy not in self.policies:
+            raise ValueError('unknown overrun policy: '+str(policy))
+        self.period = period
+        self.policy = policy
+        self.start()
+
+    def start(self, t0=None):
+        "t0: monotonic time of the first sample (default now)"
+        self.next = time.monotonic() if t0 is None else t0
+        self.last = None
+        self.missed = 0     # deadlines already passed when reached
+        self.skipped = 0    # samples dropped by the 'skip' policy
+        # achieved period (Welford)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def wait(self):
+        "sleep until the next deadline and return it (monotonic time)"
+        self.next += self.period
+        now = time.monotonic()
+        late = now - self.next
+        if late > 0:
+            self.missed += 1
+            if self.policy == 'skip':
+                k = int(late//self.period)
+                self.next += k*self.period
+                self.skipped += k
+            elif self.policy == 'stretch':
+                self.next = now
+        delay = self.next - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.tick(time.monotonic())
+        return self.next
+
+    def tick(self, now):
+        if self.last is not None:
+            dt = now - self.last
+            self.count += 1
+            d = dt - self.mean
+            self.mean += d/self.count
+            self.m2 += d*(dt - self.mean)
+            if dt < self.min:
+                self.min = dt
+            if dt > self.max:
+                self.max = dt
+        self.last = now
+
+    def statistics(self):
+        std = math.sqrt(self.m2/(self.count-1)) if self.count > 1 else 0.0
+        return {'period': self.period, 'policy': self.policy,
+                'samples': self.count + (self.last is not None),
+                'missed': self.missed, 'skipped': self.skipped,
+                'achieved_period': self.mean, 'std': std,
+                'min': self.min if self.count else 0.0, 'max': self.max}
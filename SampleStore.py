@@ -0,0 +1,156 @@
+#  Compact sample storage for the measurement history
+#
+#  2026.10.18 v1.0 array-backed store replacing the python lists
+#                  monotonic time of each sample next to the wall time
+#
+#  The newest `capacity` samples are kept in preallocated numpy arrays, one
+#  per field of record_dtype.  When the arrays are full the oldest chunk is
+#  evicted: it is appended to a spill file when one is given, otherwise it
+#  is discarded.  time/mono/power/temp return zero-copy views of the
+#  samples still in memory.
+#
+import os
+import numpy as np
+
+# one sample: wall clock time, monotonic clock time, power (mW), temp (C);
+# also the layout of the spill file and of the binary data file
+record_dtype = np.dtype([('time', '<f8'), ('mono', '<f8'),
+                         ('power', '<f4'), ('temp', '<f4')])
+# one TSP01 sample: times, 3 temperatures (C), relative humidity (%)
+tsp01_dtype = np.dtype([('time', '<f8'), ('mono', '<f8'),
+                        ('temp0', '<f4'), ('temp1', '<f4'), ('temp2', '<f4'),
+                        ('humid', '<f4')])
+
+
+class SampleStore:
+    def __init__(self, capacity=1000000, chunk=None, spill_file=None,
+                 dtype=record_dtype):
+        self.capacity = int(capacity)          # samples kept in memory
+        if chunk is None:
+            chunk = max(self.capacity//8, 1)
+        self.chunk = int(chunk)                # samples evicted at once
+        self.spill_file = spill_file
+        self.dtype = dtype
+        self.size = self.capacity + self.chunk
+        self.columns = {name: np.empty(self.size, dtype=dtype[name])
+                        for name in dtype.names}
+        self.n = 0        # samples in memory
+        self.offset = 0   # samples evicted from memory (spilled or dropped)
+        self.spilled = 0  # samples written to the spill file
+        self._spill = None
+        self.clear()
+
+    def __len__(self):
+        return self.n
+
+    def column(self, name):
+        "zero-copy view of a field of the samples in memory"
+        return self.columns[name][:self.n]
+
+    @property
+    def time(self):
+        return self.columns['time'][:self.n]
+
+    @property
+    def mono(self):
+        return self.columns['mono'][:self.n]
+
+    @property
+    def power(self):
+        return self.columns['power'][:self.n]
+
+    @property
+    def temp(self):
+        return self.columns['temp'][:self.n]
+
+    @property
+    def total(self):
+        "number of samples stored since the last clear"
+        return self.offset + self.n
+
+    def append(self, *values):
+        "one sample, values in the order of the dtype fields"
+        if self.n >= self.size:
+            self._evict()
+        i = self.n
+        for name,v in zip(self.dtype.names, values):
+            self.columns[name][i] = v
+        self.n = i + 1
+
+    def extend(self, rec):
+        "samples as a structured array with the fields of the dtype"
+        k = 0
+        while k < len(rec):
+            if self.n >= self.size:
+                self._evict()
+            m = min(len(rec) - k, self.size - self.n)
+            for name in self.dtype.names:
+                self.columns[name][self.n:self.n+m] = rec[name][k:k+m]
+            self.n += m
+            k += m
+
+    def records(self, start=0, stop=None):
+        "copy of the samples in memory [start:stop] as a structured array"
+        if stop is None:
+            stop = self.n
+        rec = np.empty(stop - start, dtype=self.dtype)
+        for name in self.dtype.names:
+            rec[name] = self.columns[name][start:stop]
+        return rec
+
+    def _evict(self):
+        c = min(self.chunk, self.n)
+        if self._spill is not None:
+            self._spill.write(self.records(0, c).tobytes())
+            self._spill.flush()
+            self.spilled += c
+        keep = self.n - c
+        for a in self.columns.values():
+            a[:keep] = a[c:self.n]
+        self.n = keep
+        self.offset += c
+
+    def clear(self):
+        self.n = 0
+        self.offset = 0
+        self.spilled = 0
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        if self.spill_file is not None:
+            # a new file: snapshots may still map the old one
+            if os.path.exists(self.spill_file):
+                os.remove(self.spill_file)
+            self._spill = open(self.spill_file, 'w+b')
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def _spilled_blocks(self, size):
+        mm = np.memmap(self.spill_file, dtype=self.dtype, mode='r',
+                       shape=(self.spilled,))
+        return [mm[k:k+size] for k in range(0, self.spilled, size)]
+
+    def snapshot(self, size=65536):
+        """Structured record blocks of the whole history that stay valid
+        while samples are added: memory-mapped spilled part and a copy
+        of the samples in memory."""
+        blocks = []
+        if self.spilled:
+            blocks += self._spilled_blocks(size)
+        if self.n:
+            blocks.append(self.records())
+        return blocks
+
+    def iter_chunks(self, size=65536):
+        """Yield (index, records) blocks over the whole history, starting
+        with the spilled part."""
+        index = self.offset - self.spilled  # dropped samples are skipped
+        if self.spilled:
+            for rec in self._spilled_blocks(size):
+                yield index, rec
+                index += len(rec)
+        for k in range(0, self.n, size):
+            yield self.offset+k, self.records(k, min(k+size, self.n))
@@ -0,0 +1,263 @@
+#  Sample stream over a local socket for several consumers
+#
+#  2026.10.18 v1.0
+#
+#  A StreamPublisher serves the samples of a SampleChannel on a Unix
+#  domain socket ('unix:/path') or on loopback TCP ('tcp:port',
+#  'tcp:host:port' with a loopback host only).  Every subscriber has its own ChannelReader, so each
+#  one is served at its own pace and none of them can slow down the
+#  acquisition: a subscriber that does not take its data gets its backlog
+#  dropped (the sequence numbers show the gap) and, when it stays behind,
+#  is disconnected.
+#
+#  Frames: uint32 length, uint32 type, payload (little endian)
+#    HELLO    JSON: record fields, measurement condition
+#    DATA     uint64 sequence number of the first record, raw records
+#    OPTIONS  JSON from the subscriber: {"every": n} (decimation)
+#
+#      publisher = StreamPublisher(channel, 'unix:/tmp/pm100usb.sock')
+#      publisher.start()
+#      ...
+#      sub = StreamSubscriber('unix:/tmp/pm100usb.sock', every=10)
+#      seq,rec = sub.read()
+#
+import os
+import json
+import ipaddress
+import socket
+import select
+import struct
+import threading
+import time
+import numpy as np
+
+HELLO = 0
+DATA = 1
+OPTIONS = 2
+
+frame_head = struct.Struct('<II')
+data_head = struct.Struct('<Q')
+
+
+def frame(kind, payload):
+    return frame_head.pack(len(payload), kind) + payload
+
+
+def parse_address(address):
+    """'unix:/path' / 'tcp:port' / 'tcp:host:port' -> (family, sockaddr);
+    the stream is local: host must be a loopback address"""
+    if address.startswith('tcp:'):
+        parts = address[4:].rsplit(':', 1)
+        if len(parts) == 1:
+            return socket.AF_INET, ('127.0.0.1', int(parts[0]))
+        host = parts[0]
+        if host != 'localhost':
+            try:
+                loopback = ipaddress.ip_address(host).is_loopback
+            except ValueError:
+                loopback = False
+            if not loopback or ':' in host:
+                raise ValueError('not a loopback address: '+host)
+        return socket.AF_INET, (host, int(parts[1]))
+    if address.startswith('unix:'):
+        address = address[5:]
+    return socket.AF_UNIX, address
+
+
+def is_address(name):
+    return name.startswith('unix:') or name.startswith('tcp:')
+
+
+class Subscription:
+    "one connected subscriber (publisher side)"
+    def __init__(self, sock, reader):
+        self.sock = sock
+        self.reader = reader
+        self.out = bytearray()   # frames not yet taken by the socket
+        self.inp = bytearray()   # partial frames from the subscriber
+        self.every = 1           # send every n-th sample
+        self.behind = 0          # successive intervals with a full backlog
+        self.dropped = 0         # samples dropped for this subscriber
+
+
+class StreamPublisher:
+    def __init__(self, channel, address, meta={}, interval=0.05,
+                 max_backlog=1<<20, max_behind=20):
+        self.channel = channel
+        self.address = address
+        self.meta = meta                # sent in the HELLO frame
+        self.interval = interval        # seconds between batches
+        self.max_backlog = max_backlog  # bytes queued per subscriber
+        self.max_behind = max_behind    # intervals before disconnecting
+        self.subscribers = []
+        self.running = False
+
+    def start(self):
+        family, sockaddr = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(sockaddr):
+            os.remove(sockaddr)   # left by a previous run
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(sockaddr)
+        self.server.listen(8)
+        self.server.setblocking(False)
+        hello = dict(self.meta)
+        hello['fields'] = [[name, self.channel.dtype[name].str]
+                           for name in self.channel.dtype.names]
+        self.hello = frame(HELLO, json.dumps(hello).encode('utf-8'))
+        self.running = True
+        self.publisher_id = threading.Thread(target=self.run)
+        self.publisher_id.daemon = True
+        self.publisher_id.start()
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            self.publisher_id.join()
+            for sub in self.subscribers:
+                sub.sock.close()
+            self.subscribers = []
+            family, sockaddr = parse_address(self.address)
+            self.server.close()
+            if family == socket.AF_UNIX and os.path.exists(sockaddr):
+                os.remove(sockaddr)
+
+    def run(self):
+        while self.running:
+            t0 = time.monotonic()
+            for sub in list(self.subscribers):
+                self.serve(sub)
+            # wait for connections, options and writable sockets
+            timeout = self.interval - (time.monotonic() - t0)
+            waiting = [sub.sock for sub in self.subscribers if sub.out]
+            r,w,x = select.select([self.server]
+                                  + [sub.sock for sub in self.subscribers],
+                                  waiting, [], max(timeout, 0))
+            for sock in r:
+                if sock is self.server:
+                    self.accept()
+                else:
+                    self.receive(sock)
+            for sock in w:
+                for sub in self.subscribers:
+                    if sub.sock is sock:
+                        self.send(sub)
+
+    def accept(self):
+        try:
+            sock, addr = self.server.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        sub = Subscription(sock, self.channel.reader())
+        sub.out += self.hello
+        self.subscribers.append(sub)
+
+    def drop(self, sub):
+        sub.sock.close()
+        if sub in self.subscribers:
+            self.subscribers.remove(sub)
+
+    def receive(self, sock):
+        sub = next(s for s in self.subscribers if s.sock is sock)
+        try:
+            data = sock.recv(4096)
+        except OSError:
+            data = b''
+        if not data:
+            self.drop(sub)
+            return
+        sub.inp += data
+        while len(sub.inp) >= frame_head.size:
+            n, kind = frame_head.unpack_from(sub.inp)
+            if len(sub.inp) < frame_head.size + n:
+                break
+            payload = bytes(sub.inp[frame_head.size:frame_head.size+n])
+            del sub.inp[:frame_head.size+n]
+            if kind == OPTIONS:
+                sub.every = max(int(json.loads(payload).get('every', 1)), 1)
+
+    def serve(self, sub):
+        if len(sub.out) > self.max_backlog:
+            # not taking its data: drop what is queued
+            # (the next frame starts at a later sequence number)
+            sub.behind += 1
+            if sub.behind > self.max_behind:
+                self.drop(sub)
+                return
+            pending = sub.reader.pending()
+            sub.dropped += pending
+            sub.reader.reset()
+            return
+        sub.behind = 0
+        seq, rec = sub.reader.read()
+        if sub.every > 1:
+            # keep the samples whose sequence number is a multiple of every
+            first = (-seq) % sub.every
+            rec = rec[first::sub.every]
+            seq += first
+        if len(rec):
+            sub.out += frame(DATA, data_head.pack(seq) + rec.tobytes())
+        self.send(sub)
+
+    def send(self, sub):
+        if not sub.out:
+            return
+        try:
+            n = sub.sock.send(sub.out)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.drop(sub)
+            return
+        del sub.out[:n]
+
+
+class StreamSubscriber:
+    def __init__(self, address, every=1, timeout=5.0):
+        family, sockaddr = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(sockaddr)
+        self.buf = bytearray()
+        kind, payload = self.receive()
+        if kind != HELLO:
+            raise IOError('not a sample stream: '+address)
+        self.meta = json.loads(payload.decode('utf-8'))
+        self.dtype = np.dtype([(name, fmt) for name,fmt in self.meta['fields']])
+        if every > 1:
+            self.sock.sendall(frame(OPTIONS, json.dumps({'every': every}).encode('utf-8')))
+        self.every = every
+        self.seq = None   # sequence number expected next
+        self.lost = 0     # samples dropped by the publisher
+
+    def receive(self):
+        "the next frame: (type, payload); raises socket.timeout"
+        while True:
+            if len(self.buf) >= frame_head.size:
+                n, kind = frame_head.unpack_from(self.buf)
+                if len(self.buf) >= frame_head.size + n:
+                    payload = bytes(self.buf[frame_head.size:frame_head.size+n])
+                    del self.buf[:frame_head.size+n]
+                    return kind, payload
+            data = self.sock.recv(65536)
+            if not data:
+                raise EOFError('sample stream closed')
+            self.buf += data
+
+    def read(self):
+        "(seq, records) of the next batch"
+        while True:
+            kind, payload = self.receive()
+            if kind == DATA:
+                break
+        seq, = data_head.unpack_from(payload)
+        rec = np.frombuffer(payload, dtype=self.dtype, offset=data_head.size)
+        if self.seq is not None and seq > self.seq:
+            self.lost += (seq - self.seq)//self.every
+        self.seq = seq + len(rec)*self.every
+        return seq, rec
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,281 @@
+#  Simulated ThorLabs USBTMC devices (PM100USB, TSP01)
+#
+#  2026.10.18 v1.0
+#
+#  The simulated instruments understand the SCPI commands used by
+#  ThorlabUSBTMC and are reached through the usbtmc transport registry,
+#  so pm100usb/tsp01/PM100USB run unchanged without hardware:
+#
+#      import SimUSBTMC
+#      SimUSBTMC.install()             # 'sim:pm100usb0', 'sim:tsp010'
+#      dev = thorlabs.pm100usb()
+#      dev.open('sim:pm100usb0')
+#
+#  latency   seconds per write/read (plus meas_time*average per reading)
+#  noise     relative gaussian noise of the power
+#  fault_rate probability that a read times out (OSError ETIMEDOUT)
+#  Unknown commands get no reply and put -113 in the error queue (SYST:ERR?)
+#
+import errno
+import random
+import threading
+import time
+import usbtmc
+
+# long SCPI keywords -> short form
+long_forms = {
+    'SENSE': 'SENS', 'SENSOR': 'SENS', 'SYSTEM': 'SYST', 'AVERAGE': 'AVER',
+    'COUNT': 'COUN', 'CORRECTION': 'CORR', 'WAVELENGTH': 'WAV',
+    'INPUT': 'INP', 'FILTER': 'FILT', 'LPASS': 'LPAS', 'STATE': 'STAT',
+    'CONFIGURE': 'CONF', 'MEASURE': 'MEAS', 'POWER': 'POW',
+    'TEMPERATURE': 'TEMP', 'HUMIDITY': 'HUM', 'FETCH': 'FETC',
+    'INITIATE': 'INIT', 'SCALAR': 'SCAL',
+}
+
+
+def normalize(header, keep_suffix=True):
+    "'SENSe1:AVERage:COUNt?' -> 'SENS1:AVER:COUN?'"
+    query = header.endswith('?')
+    if query:
+        header = header[:-1]
+    words = []
+    for kw in header.strip(':').upper().split(':'):
+        digits = ''
+        while kw and kw[-1].isdigit() and not kw.startswith('*'):
+            digits = kw[-1] + digits
+            kw = kw[:-1]
+        kw = long_forms.get(kw, kw)
+        words.append(kw + (digits if keep_suffix else ''))
+    return ':'.join(words) + ('?' if query else '')
+
+
+class SimInstrument:
+    keep_suffix = True
+    idn = 'Thorlabs,SIM,0,0.0'
+
+    def __init__(self, latency=0.0005, noise=0.001, fault_rate=0.0, seed=None):
+        self.latency = latency
+        self.noise = noise
+        self.fault_rate = fault_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.connected = True
+        self.response = []
+        self.pending = b''  # rest of a reply longer than the last read
+        self.errors = []    # SCPI error queue, read with SYST:ERR?
+        self.commands = 0   # commands received, for the benchmarks
+        self.reset()
+
+    def reset(self):
+        pass
+
+    def disconnect(self):
+        "the next transfers fail like an unplugged device"
+        self.connected = False
+
+    def wait(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def write(self, message):
+        if not self.connected:
+            raise OSError(errno.ENODEV, 'simulated device disconnected')
+        self.wait(self.latency)
+        with self.lock:
+            for command in message.strip().split(';'):
+                command = command.strip()
+                if not command:
+                    continue
+                self.commands += 1
+                parts = command.split(None, 1)
+                header = normalize(parts[0], self.keep_suffix)
+                arg = parts[1].strip() if len(parts) > 1 else None
+                res = self.execute(header, arg)
+                if header.endswith('?') and res is not None:
+                    self.response.append(res)
+
+    def read(self, length=4000):
+        if not self.connected:
+            raise OSError(errno.ENODEV, 'simulated device disconnected')
+        self.wait(self.latency)
+        with self.lock:
+            if self.pending:
+                res = self.pending
+            elif not self.response \
+               or self.random.random() < self.fault_rate:
+                self.response = []
+                raise OSError(errno.ETIMEDOUT, 'simulated timeout')
+            else:
+                res = b';'.join(r if isinstance(r, bytes) else r.encode('ascii')
+                                for r in self.response) + b'\n'
+                self.response = []
+            self.pending = res[length:]
+        return res[:length]
+
+    def execute(self, header, arg):
+        if header == '*IDN?':
+            return self.idn
+        if header == '*RST':
+            self.reset()
+            return None
+        if header == '*CLS':
+            self.errors = []
+            return None
+        if header == 'SYST:ERR?':
+            if self.errors:
+                return self.errors.pop(0)
+            return '0,"No error"'
+        return self.command(header, arg)
+
+    def undefined(self, header):
+        "like the instrument: no reply, error -113 in the error queue"
+        self.errors.append('-113,"Undefined header;'+header+'"')
+        return None
+
+    def command(self, header, arg):
+        return self.undefined(header)
+
+
+class SimPM100USB(SimInstrument):
+    keep_suffix = False
+    idn = 'Thorlabs,PM100USB,P2000000,1.6.0'
+    sensor_idn = 'S120C,00000000,01-Jan-2020,1,18,289'
+
+    def __init__(self, power=1.0e-3, temp=25.0, meas_time=0.0, **kwargs):
+        self.power = power          # W
+        self.temp = temp            # C
+        self.meas_time = meas_time  # seconds per averaged reading
+        super().__init__(**kwargs)
+
+    def reset(self):
+        self.wavelength = 633.0
+        self.average = 1
+        self.bw = 1
+        self.mode = 'POW'
+        self.last = 0.0
+
+    def reading(self):
+        self.wait(self.meas_time*self.average)
+        if self.mode == 'TEMP':
+            value = self.temp + self.random.gauss(0.0, 0.01)
+        else:
+            value = self.power*(1.0 + self.random.gauss(0.0, self.noise))
+        self.last = value
+        return '{:.6E}'.format(value)
+
+    def command(self, header, arg):
+        if header == 'SYST:SENS:IDN?':
+            return self.sensor_idn
+        if header == 'SENS:CORR:WAV':
+            self.wavelength = float(arg)
+        elif header == 'SENS:CORR:WAV?':
+            return '{:.6E}'.format(self.wavelength)
+        elif header == 'SENS:AVER:COUN' or header == 'SENS:AVER':
+            self.average = int(float(arg))
+        elif header == 'SENS:AVER:COUN?' or header == 'SENS:AVER?':
+            return str(self.average)
+        elif header == 'INP:FILT:LPAS:STAT' or header == 'INP:FILT:STAT':
+            self.bw = int(arg)
+        elif header == 'INP:FILT:LPAS:STAT?' or header == 'INP:FILT:STAT?':
+            return str(self.bw)
+        elif header in ('CONF:POW', 'CONF:SCAL:POW'):
+            self.mode = 'POW'
+        elif header in ('CONF:TEMP', 'CONF:SCAL:TEMP'):
+            self.mode = 'TEMP'
+        elif header == 'CONF?':
+            return self.mode
+        elif header in ('READ?', 'MEAS?'):
+            return self.reading()
+        elif header in ('MEAS:POW?', 'MEAS:SCAL:POW?'):
+            self.mode = 'POW'
+            return self.reading()
+        elif header in ('MEAS:TEMP?', 'MEAS:SCAL:TEMP?'):
+            self.mode = 'TEMP'
+            return self.reading()
+        elif header == 'INIT':
+            self.reading()
+        elif header == 'FETC?':
+            return '{:.6E}'.format(self.last)
+        else:
+            return self.undefined(header)
+        return None
+
+
+class SimTSP01(SimInstrument):
+    idn = 'Thorlabs,TSP01,M00000000,1.2.0'
+
+    def __init__(self, temps=(24.0, 22.0, 23.0), humidity=40.0, **kwargs):
+        self.temps = list(temps)
+        self.humidity = humidity
+        super().__init__(**kwargs)
+
+    def command(self, header, arg):
+        channels = {'SENS1:TEMP:DATA?': 0, 'SENS3:TEMP:DATA?': 1,
+                    'SENS4:TEMP:DATA?': 2}
+        if header in channels:
+            value = self.temps[channels[header]] + self.random.gauss(0.0, 0.01)
+            return '{:.2f}'.format(value)
+        if header == 'SENS2:HUM:DATA?':
+            return '{:.2f}'.format(self.humidity + self.random.gauss(0.0, 0.1))
+        return self.undefined(header)
+
+
+# device name -> simulated instrument
+instruments = {}
+
+
+class SimUSBTMC(usbtmc.USBTMC):
+    "USBTMC device talking to a simulated instrument"
+    def __init__(self, device):
+        self.device = device
+        self.init_buffers()
+        self.inst = instruments.get(device)
+        self.FILE = 1 if self.inst is not None else None
+
+    def write(self, command):
+        self.inst.write(command)
+
+    def read(self, length=None):
+        if length is None:
+            length = 4000
+        return self.inst.read(length)
+
+    def read_into(self, view=None):
+        if view is None:
+            view = self.view
+        res = self.inst.read(len(view))
+        view[:len(res)] = res
+        return len(res)
+
+    def set_timeout(self, seconds):
+        pass  # a missing reply times out at once
+
+    def close(self):
+        self.FILE = None
+
+
+def register(name, inst):
+    "make inst reachable as the usbtmc device `name` ('sim:...')"
+    instruments[name] = inst
+    if name not in usbtmc.extra_devices:
+        usbtmc.extra_devices.append(name)
+    usbtmc.transports['sim:'] = SimUSBTMC
+    return name
+
+
+def install(pm100usb=1, tsp01=1, **kwargs):
+    "register simulated devices 'sim:pm100usbN' and 'sim:tsp01N'"
+    names = []
+    for i in range(pm100usb):
+        names.append(register('sim:pm100usb'+str(i), SimPM100USB(**kwargs)))
+    for i in range(tsp01):
+        names.append(register('sim:tsp01'+str(i), SimTSP01()))
+    return names
+
+
+def uninstall():
+    for name in instruments:
+        if name in usbtmc.extra_devices:
+            usbtmc.extra_devices.remove(name)
+    instruments.clear()
+    usbtmc.transports.pop('sim:', None)
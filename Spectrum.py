@@ -0,0 +1,74 @@
+#  Streaming power spectral density of the measured power
+#
+#  2026.10.18 v1.0 Welch estimate updated with every block of samples
+#
+#  The samples are cut into segments of nperseg samples overlapping by
+#  noverlap; each segment is FFT-ed once, when it is complete (all the
+#  segments completed by a block in one vectorised rfft), and its
+#  periodogram is added to a running average.  So the cost per sample is
+#  constant and the history is never transformed again.
+#    average='mean'  all segments since clear() count the same
+#    average='exp'   exponential average over about `memory` segments
+#
+import numpy as np
+
+
+class WelchPSD:
+    def __init__(self, fs, nperseg=1024, noverlap=None, average='mean',
+                 memory=32):
+        self.fs = fs                    # sampling frequency (Hz)
+        self.nperseg = nperseg
+        if noverlap is None:
+            noverlap = nperseg//2
+        self.step = nperseg - noverlap  # new samples per segment
+        self.average = average
+        self.memory = memory
+        # periodic Hann window
+        self.window = 0.5 - 0.5*np.cos(2*np.pi*np.arange(nperseg)/nperseg)
+        # one-sided density scaling (like scipy.signal.welch)
+        self.scale = np.full(nperseg//2 + 1, 2.0/(fs*(self.window**2).sum()))
+        self.scale[0] /= 2
+        if nperseg % 2 == 0:
+            self.scale[-1] /= 2
+        self.freq = np.fft.rfftfreq(nperseg, 1.0/fs)
+        self.clear()
+
+    def clear(self):
+        self.buf = np.empty(0)     # samples of the incomplete segments
+        self.sum = np.zeros(len(self.freq))
+        self.segments = 0
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        buf = np.concatenate((self.buf, values))
+        k = (len(buf) - self.nperseg)//self.step + 1 # complete segments
+        if k <= 0:
+            self.buf = buf
+            return 0
+        seg = np.lib.stride_tricks.as_strided(
+            buf, shape=(k, self.nperseg),
+            strides=(self.step*buf.strides[0], buf.strides[0]))
+        seg = seg - seg.mean(axis=1, keepdims=True)  # constant detrend
+        p = np.abs(np.fft.rfft(seg*self.window, axis=1))**2 * self.scale
+        if self.average == 'exp':
+            a = 1.0/self.memory
+            for row in p:
+                if self.segments == 0:
+                    self.sum[:] = row
+                else:
+                    self.sum += a*(row - self.sum)
+                self.segments += 1
+        else:
+            self.sum += p.sum(axis=0)
+            self.segments += k
+        self.buf = buf[k*self.step:].copy()
+        return k
+
+    def psd(self):
+        "(frequency, power spectral density in value**2/Hz)"
+        if self.segments == 0:
+            return self.freq, np.zeros(len(self.freq))
+        if self.average == 'exp':
+            return self.freq, self.sum.copy()
+        return self.freq, self.sum/self.segments
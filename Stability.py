@@ -0,0 +1,135 @@
+#  Stability analysis of the measured power
+#
+#  2026.10.18 v1.0 overlapping and modified Allan deviation
+#
+#  Both deviations are taken from running sums, so every averaging time
+#  costs O(N) vectorised operations:
+#    X[k] = sum of (y - mean) over the first k samples (phase)
+#    Y[k] = sum of X over the first k points
+#    overlapping Allan  X[i+2m] - 2X[i+m] + X[i]
+#                       = m * (mean of the next m samples - of these m)
+#    modified Allan     Y[i+3m] - 3Y[i+2m] + 3Y[i+m] - Y[i]
+#                       = sum of m successive phase second differences
+#  The samples may come in blocks (e.g. SampleStore.snapshot() or the
+#  records of a BinaryReader, memory-mapped), and the sums of squares are
+#  accumulated over chunks, so the only full size arrays are X and Y.
+#  Non-finite samples (gaps) are left out.
+#
+import numpy as np
+
+
+def as_blocks(y):
+    if isinstance(y, np.ndarray):
+        return [y]
+    return list(y)
+
+
+def running_sums(blocks, modified=False):
+    "X (and Y when modified) of the samples in blocks"
+    total = 0.0
+    n = 0
+    for b in blocks:
+        b = np.asarray(b, dtype=np.float64)
+        b = b[np.isfinite(b)]
+        total += b.sum()
+        n += len(b)
+    mean = total/n if n else 0.0
+    x = np.empty(n+1)
+    x[0] = 0.0
+    k = 0
+    for b in blocks:
+        b = np.asarray(b, dtype=np.float64)
+        b = b[np.isfinite(b)]
+        np.cumsum(b - mean, out=x[k+1:k+1+len(b)])
+        x[k+1:k+1+len(b)] += x[k]
+        k += len(b)
+    if not modified:
+        return mean, x, None
+    y = np.empty(n+2)
+    y[0] = 0.0
+    np.cumsum(x, out=y[1:])
+    return mean, x, y
+
+
+def octave_factors(n, k):
+    "averaging factors 1, 2, 4, ... with at least one term (n samples)"
+    m = []
+    f = 1
+    while k*f <= n:
+        m.append(f)
+        f *= 2
+    return np.array(m, dtype=np.int64)
+
+
+def sum_squares(terms, count, chunk):
+    "sum over i < count of terms(i0, i1)**2, chunk by chunk"
+    acc = 0.0
+    for i0 in range(0, count, chunk):
+        d = terms(i0, min(i0+chunk, count))
+        acc += float(d @ d)
+    return acc
+
+
+def allan_deviation(y, tau0, m=None, chunk=1<<20, sums=None):
+    """Overlapping Allan deviation of the samples y (an array or blocks of
+    arrays) taken every tau0 seconds; m: averaging factors (default
+    octaves).  Returns (tau, adev, terms)."""
+    if sums is None:
+        sums = running_sums(as_blocks(y))
+    mean, x, _ = sums
+    n = len(x) - 1
+    if m is None:
+        m = octave_factors(n, 2)
+    m = np.asarray(m, dtype=np.int64)
+    m = m[(m >= 1) & (2*m <= n)]
+    adev = np.empty(len(m))
+    count = n - 2*m + 1
+    for j,f in enumerate(m):
+        f = int(f)
+        s = sum_squares(lambda i0, i1: x[i0+2*f:i1+2*f] - 2*x[i0+f:i1+f] + x[i0:i1],
+                        int(count[j]), chunk)
+        adev[j] = np.sqrt(s/(2.0*f*f*count[j]))
+    return m*tau0, adev, count
+
+
+def modified_allan_deviation(y, tau0, m=None, chunk=1<<20, sums=None):
+    """Modified Allan deviation (see allan_deviation)"""
+    if sums is None or sums[2] is None:
+        sums = running_sums(as_blocks(y), modified=True)
+    mean, x, yy = sums
+    n = len(x) - 1
+    if m is None:
+        m = octave_factors(n, 3)
+    m = np.asarray(m, dtype=np.int64)
+    m = m[(m >= 1) & (3*m <= n+1)]
+    mdev = np.empty(len(m))
+    count = n - 3*m + 2
+    for j,f in enumerate(m):
+        f = int(f)
+        s = sum_squares(lambda i0, i1: yy[i0+3*f:i1+3*f] - 3*yy[i0+2*f:i1+2*f]
+                        + 3*yy[i0+f:i1+f] - yy[i0:i1], int(count[j]), chunk)
+        mdev[j] = np.sqrt(s/(2.0*f**4*count[j]))
+    return m*tau0, mdev, count
+
+
+def sample_interval(tim):
+    "median interval of the sample times (seconds)"
+    blocks = [np.asarray(t) for t in as_blocks(tim) if len(t) > 1]
+    if not blocks:
+        return None
+    return float(np.median(np.diff(blocks[-1])))
+
+
+def stability(power, tau0, relative=True):
+    """Both deviations of the power; relative: divided by the mean.
+    Returns {'mean', 'tau', 'adev', 'tau_mod', 'mdev'}."""
+    blocks = as_blocks(power)
+    sums = running_sums(blocks, modified=True)
+    tau, adev, n = allan_deviation(None, tau0, sums=sums)
+    tau_mod, mdev, n = modified_allan_deviation(None, tau0, sums=sums)
+    mean = sums[0]
+    if relative and mean:
+        adev = adev/abs(mean)
+        mdev = mdev/abs(mean)
+    return {'mean': mean, 'tau': tau, 'adev': adev,
+            'tau_mod': tau_mod, 'mdev': mdev}
@@ -3,13 +3,19 @@
 #
 #  2020.11.25 v1.0 Goro Nishimura
 #       12.6  v1.1 current time is using time.time() instead of datetime.now()
+#  2026.10.18 v1.2 device access is arbitrated by DeviceAccess (no busy wait)
+#                  pm100usb stays in power mode, temperature is decimated
+#                  connect without *RST, configuration applied in one write
+#                  tsp01 read with one compound query
+#                  numeric replies parsed with query_float(s)
 #
 #  PM100USB with Si detector
 #  TSP01 temperature/humidity sensor
 # 
-from usbtmc import USBTMC as usbtmc_dev
+from usbtmc import open_device as usbtmc_dev
 from usbtmc import find_device, list_devinfo
 from enum import IntEnum
+import threading
 import time
 
 def list_thorlabs_devinfo( name=''):
@@ -20,6 +26,53 @@ def list_thorlabs_devinfo( name=''):
                 res.append(dev[0]+':('+','.join(dev[1:])+')')
     return res
 
+def query_joined(dev, commands):
+    "replies of several queries sent as one message (one USB transaction)"
+    res = ';'.join(dev.query(';:'.join(commands))).split(';')
+    if len(res) != len(commands):
+        raise IOError('unexpected reply: '+';'.join(res))
+    return res
+
+# Exclusive access to a device shared by the measurement thread and the
+# configuration commands.  Waiting threads are served first come first
+# served, so a command issued during a measurement runs right after the
+# current sample instead of waiting for the measurement to stop.
+class DeviceAccess:
+    def __init__(self, timeout=10.0):
+        self.timeout = timeout  # seconds, for the 'with' statement
+        self.cond = threading.Condition()
+        self.next_ticket = 0
+        self.serving = 0
+        self.abandoned = set() # tickets of timed out waiters
+
+    def acquire(self, timeout=None):
+        with self.cond:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            if self.cond.wait_for(lambda: self.serving == ticket, timeout):
+                return True
+            self.abandoned.add(ticket)
+            return False
+
+    def release(self):
+        with self.cond:
+            self.serving += 1
+            while self.serving in self.abandoned:
+                self.abandoned.remove(self.serving)
+                self.serving += 1
+            self.cond.notify_all()
+
+    def busy(self):
+        return self.serving != self.next_ticket
+
+    def __enter__(self):
+        if not self.acquire(self.timeout):
+            raise TimeoutError('device is busy')
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
 class pm100usb_bw(IntEnum):
     low = 1
     high = 0
@@ -34,9 +87,25 @@ class pm100usb:
         self.average = 100
         self.bw = 1
         self.active = False
-        self.during_meas = False
+        self.state = {}         # instrument configuration last read
+        self.access = DeviceAccess()
+        # the sensor temperature changes slowly: it is read every
+        # temp_every samples and/or temp_interval seconds (None: not used)
+        self.temp_every = 10
+        self.temp_interval = None
+        self.mode = None        # quantity the head is configured for
+        self.td_mono = 0.0
+        self.clear_budget()
         
-    def open(self, dev_name=None, dev_sn=None):
+    # parameter -> (SCPI header, type); the instrument state is read with
+    # one joined query and changes are sent with one joined command
+    config_commands = {
+        'wavelength': ('SENS:CORR:WAV', float),
+        'average': ('SENS:AVER:COUN', int),
+        'bw': ('INP:FILT:LPAS:STAT', int),
+    }
+
+    def open(self, dev_name=None, dev_sn=None, reset=False):
         if self.active:
             return True  # already open and ignore
         
@@ -50,73 +119,197 @@ class pm100usb:
             else:
                 dev_name = d[0]
 
+        if not self.connect(dev_name, reset):
+            return False
+        self.apply_config()
+        return True
+
+    def connect(self, dev_name, reset=False):
+        "open the device and read its identification and state"
         self.dev = usbtmc_dev(dev_name)
-        if self.dev.FILE:
-            self.dev.sendReset()
-            self.device_info = self.dev.getInfo()
-            self.sensor_info = self.dev.query("SYSTEM:SENSOR:IDN?")
-            if self.wavelength != self.get_wavelength():
-                self.set_wavelength( self.wavelength)
-            if self.average != self.get_average():
-                self.set_average( self.average)
-            if self.bw != self.get_bw():
-                self.set_bw( self.bw)
-            self.active = True
-            return True
-        else:
+        if not self.dev.FILE:
             self.active = False
             return False
+        self.dev_name = dev_name
+        self.mode = None
+        if reset:
+            self.dev.sendReset()
+        # identification and state in one transaction
+        try:
+            res = self.query_joined(['*IDN?', 'SYST:SENS:IDN?']
+                                    + self.config_queries())
+            state = self.parse_config(res[2:])
+        except (OSError, ValueError):
+            self.dev.close()
+            return False
+        self.device_info = [res[0]]
+        self.sensor_info = [res[1]]
+        self.state = state
+        self.active = True
+        return True
+
+    def reconnect(self):
+        """open the device again after a USB error, keeping the
+        configuration; no command gets in between close and open"""
+        with self.access:
+            if self.active:
+                self.active = False
+                try:
+                    self.dev.close()
+                except OSError:
+                    pass
+            if not self.connect(self.dev_name):
+                return False
+            self.write_config(self.config_diff())
+        return True
+
+    def query_joined(self, commands):
+        return query_joined(self.dev, commands)
+
+    def config_queries(self):
+        return [h+'?' for h,t in self.config_commands.values()]
+
+    def parse_config(self, values):
+        return {name: t(float(v)) for (name,(h,t)),v
+                in zip(self.config_commands.items(), values)}
+
+    def config(self):
+        "configuration wanted by the program"
+        return {name: getattr(self, name) for name in self.config_commands}
+
+    def config_diff(self, config=None):
+        "parameters of config that differ from the instrument state"
+        if config is None:
+            config = self.config()
+        diff = {}
+        for name,value in config.items():
+            t = self.config_commands[name][1]
+            if name not in self.state or abs(t(value) - self.state[name]) > 1e-6*abs(self.state[name]):
+                diff[name] = t(value)
+        return diff
+
+    def apply_config(self, config=None):
+        """Send the parameters differing from the instrument state in one
+        write and read the state back once; returns the changed ones."""
+        if config is not None:
+            for name,value in config.items():
+                setattr(self, name, value)
+        with self.access:
+            diff = self.config_diff()
+            self.write_config(diff)
+        return diff
+
+    def write_config(self, diff):
+        # with self.access held
+        if not diff:
+            return
+        self.dev.write(';:'.join(
+            self.config_commands[name][0]+' '+str(value)
+            for name,value in diff.items()))
+        try:
+            self.state = self.parse_config(
+                self.query_joined(self.config_queries()))
+        except ValueError:
+            return  # garbled readback: keep the old state, diff is sent again
+        # keep what the instrument accepted
+        for name,value in diff.items():
+            if self.state[name] != value:
+                setattr(self, name,
+                        type(getattr(self, name))(self.state[name]))
+
+    @property
+    def during_meas(self):
+        return self.access.busy()
 
-    def wait_measurement(self):
-        # if another process uses measurement, it must wait
-        while self.during_meas:
-            pass
-    
     def set_average(self, count):
-        self.wait_measurement()
-        self.dev.write("SENS:AVERAGE:COUNT "+str(count))
-        self.average = count
+        with self.access:
+            self.dev.write("SENS:AVERAGE:COUNT "+str(count))
+        self.average = self.state['average'] = count
 
     def get_average(self):
-        self.wait_measurement()        
-        return self.dev.query("SENS:AVER:COUNT?")
+        with self.access:
+            return int(self.dev.query_float("SENS:AVER:COUNT?"))
 
     def set_wavelength(self, wavelength):
-        self.wait_measurement()
-        self.dev.write("SENS:CORR:WAV "+str(wavelength))
-        self.wavelength = wavelength
+        with self.access:
+            self.dev.write("SENS:CORR:WAV "+str(wavelength))
+        self.wavelength = self.state['wavelength'] = wavelength
 
     def get_wavelength(self):
-        self.wait_measurement()
-        return self.dev.query("SENS:CORR:WAV?")
+        with self.access:
+            return self.dev.query_float("SENS:CORR:WAV?")
 
     def set_bw( self, bw):
-        self.wait_measurement()
-        self.dev.write("INPUT:FILT:LPAS:STATE "+str(bw))
-        self.bw = bw
+        with self.access:
+            self.dev.write("INPUT:FILT:LPAS:STATE "+str(bw))
+        self.bw = self.state['bw'] = bw
         
     def get_bw( self):
-        self.wait_measurement()
-        return self.dev.query("INPUT:FILT:LPAS:STATE?")
+        with self.access:
+            return int(self.dev.query_float("INPUT:FILT:LPAS:STATE?"))
         
+    # one query per reading: READ? while the head is in power mode,
+    # MEAS (configure and read) after switching
     def get_power( self):
-        self.dev.write("CONF:POW")
-        res = self.dev.query("READ?")
-        return float(res[0])
+        if self.mode == 'POW':
+            res = self.dev.query_float("READ?")
+        else:
+            res = self.dev.query_float("MEAS:POW?")
+            self.mode = 'POW'
+        self.transactions += 1
+        return res
 
     def get_temp( self):
-        self.dev.write("CONF:TEMP")
-        res = self.dev.query("READ?")
-        return float(res[0])
+        res = self.dev.query_float("MEAS:TEMP?")
+        self.mode = 'TEMP'
+        self.transactions += 1
+        return res
+
+    def temp_due( self, mono):
+        if self.temp_count == 0: # the first sample
+            return True
+        if self.temp_every and self.temp_count >= self.temp_every:
+            return True
+        if self.temp_interval is not None \
+           and mono - self.temp_time >= self.temp_interval:
+            return True
+        return False
 
     def get_data( self):
-        self.wait_measurement()
-        td = time.time()
-        self.during_meas = True
-        power = self.get_power()
-        temp = self.get_temp()
-        self.during_meas = False
-        return td,power,temp
+        with self.access:
+            t0 = time.perf_counter()
+            td = time.time()
+            self.td_mono = time.monotonic() # monotonic time of this sample
+            power = self.get_power()
+            if self.temp_due( self.td_mono): # not upset by clock steps
+                self.last_temp = self.get_temp()
+                self.temp_time = self.td_mono
+                self.temp_count = 0
+            self.temp_count += 1
+            dt = time.perf_counter() - t0
+        self.samples += 1
+        self.usb_time += dt
+        if dt > self.usb_time_max:
+            self.usb_time_max = dt
+        return td,power,self.last_temp
+
+    # measured USB cost of get_data()
+    def clear_budget( self):
+        self.samples = 0
+        self.transactions = 0
+        self.usb_time = 0.0
+        self.usb_time_max = 0.0
+        self.temp_count = 0
+        self.temp_time = 0.0
+        self.last_temp = 0.0
+
+    def transaction_budget( self):
+        if self.samples == 0:
+            return {'samples': 0}
+        return {'samples': self.samples,
+                'queries_per_sample': self.transactions/self.samples,
+                'time_per_sample': self.usb_time/self.samples,
+                'max_time': self.usb_time_max}
 
     def close(self):
         if self.active:
@@ -124,18 +317,23 @@ class pm100usb:
             self.dev.close()
         
 class tsp01:
+    # temperature of the internal sensor and the two external probes,
+    # and humidity, read with one compound query
+    data_queries = ['SENS1:TEMP:DATA?', 'SENS3:TEMP:DATA?',
+                    'SENS4:TEMP:DATA?', 'SENS2:HUM:DATA?']
+
     def __init__(self):
         self.dev_name = '/dev/usbtmc0'
-        self.device_info = ''
-        self.active = True
-        self.during_meas = False
-        
-    def wait_measurement(self):
-        # if another process uses measurement, it must wait
-        while self.during_meas:
-            pass
+        self.device_info = []
+        self.active = False
+        self.access = DeviceAccess()
+        self.td_mono = 0.0
+
+    @property
+    def during_meas(self):
+        return self.access.busy()
 
-    def open(self, dev_name=None, dev_sn=None):
+    def open(self, dev_name=None, dev_sn=None, reset=False):
         if self.active:
             return True
         
@@ -145,42 +343,54 @@ class tsp01:
             else:
                 d = find_device('TSP01', dev_sn)
             if d == None:
-                return None
+                return False
             else:
                 dev_name = d[0]
 
         self.dev = usbtmc_dev(dev_name)
-        self.dev.sendReset()
-        self.device_info = self.dev.getInfo()
+        if not self.dev.FILE:
+            return False
+        self.dev_name = dev_name
+        if reset:
+            self.dev.sendReset()
+        try:
+            self.device_info = self.dev.getInfo()
+        except OSError:
+            self.dev.close()
+            return False
         self.active = True
+        return True
+
+    def reconnect(self):
+        "open the device again after a USB error"
+        with self.access:
+            if self.active:
+                self.active = False
+                try:
+                    self.dev.close()
+                except OSError:
+                    pass
+            return tsp01.open(self, self.dev_name)
 
     def get_temp(self, ch=0):
-        if ch==0:
-            res= self.dev.query('SENS1:TEMP:DATA?')
-        elif ch==1:
-            res= self.dev.query('SENS3:TEMP:DATA?')
-        elif ch==2:
-            res= self.dev.query('SENS4:TEMP:DATA?')
-        else:
-            res = ['-100']
-        return float(res[0])
+        if ch not in (0, 1, 2):
+            return -100.0
+        return self.dev.query_float(self.data_queries[ch])
 
     def get_humid(self):
-        return self.dev.query('SENS2:HUM:DATA?')
+        return self.dev.query_float('SENS2:HUM:DATA?')
 
     def get_data( self):
-        self.wait_measurement()
-        td = time.time()
-        self.during_meas = True
-        temp0 = self.get_temp()
-        temp1 = self.get_temp(1)
-        temp2 = self.get_temp(2)
-        humid = self.get_humid()
-        self.during_meas = False
+        with self.access:
+            td = time.time()
+            self.td_mono = time.monotonic() # monotonic time of this sample
+            res = self.dev.query_floats(';:'.join(self.data_queries))
+        if len(res) != len(self.data_queries):
+            raise IOError('unexpected reply: '+str(res))
+        temp0, temp1, temp2, humid = res
         return td,temp0,temp1,temp2,humid
 
     def close(self):
         if self.active:
             self.active = False
             self.dev.close()
-        
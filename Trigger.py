@@ -0,0 +1,193 @@
+#  Trigger with pre-trigger buffer for short events (e.g. laser dropouts)
+#
+#  2026.10.18 v1.0
+#             v1.1 captures cut short by a stop are written (partial)
+#                  fast samples kept out of the main recording
+#
+#  The trigger sees every sample in the measurement thread, right after it
+#  is read, and keeps the latest ones in its own ring (a SampleChannel).
+#  When the condition is met the measurement is switched to fast mode
+#  (average `fast_average`, no temperature reads, period `fast_period`)
+#  for `post` seconds; then the normal settings come back and the samples
+#  from `pre` seconds before the trigger to the end of the capture are
+#  written to an event file of their own (BinaryRecord format) by a
+#  writer thread, so the measurement never waits for the disk.
+#  During a capture only one sample per normal period goes on to the main
+#  recording (main_sample), so its sample period stays uniform; the fast
+#  samples are in the event file only.  When the measurement stops during
+#  a capture, flush() restores the settings and writes what was captured.
+#
+#  Conditions
+#    'below', 'above'      power below/above level (fires again after the
+#                          holdoff while it lasts)
+#    'falling', 'rising'   power crossing level downwards/upwards
+#    'deviation'           |power - mean| > deviation*|mean|, mean being an
+#                          exponential average over `tau` seconds
+#
+#      trigger = Trigger(meas, 'falling', level=0.5, pre=1.0, post=2.0)
+#      meas.trigger = trigger
+#
+import os
+import math
+import time
+import threading
+from BinaryRecord import BinaryFormat
+from SampleChannel import SampleChannel
+
+
+class Trigger:
+    kinds = ('below', 'above', 'falling', 'rising', 'deviation')
+
+    def __init__(self, meas, kind='below', level=0.0, deviation=0.1, tau=10.0,
+                 pre=1.0, post=1.0, holdoff=1.0, fast_period=0.001,
+                 fast_average=1, directory='.', prefix='event', size=65536):
+        if kind not in self.kinds:
+            raise ValueError('unknown trigger condition: '+str(kind))
+        self.meas = meas            # PM100USB whose samples are watched
+        self.kind = kind
+        self.level = level          # mW
+        self.deviation = deviation  # relative to the mean
+        self.tau = tau              # seconds, mean of 'deviation'
+        self.pre = pre              # seconds kept before the trigger
+        self.post = post            # seconds captured after it
+        self.holdoff = holdoff      # seconds after a capture before rearming
+        self.fast_period = fast_period    # None: keep the period
+        self.fast_average = fast_average  # None: keep the average
+        self.directory = directory
+        self.prefix = prefix
+        self.ring = SampleChannel(size, meas.channel.dtype)
+        self.events = []            # files written
+        self.on_event = None        # called with the file name (writer thread)
+        self.writers = []
+        self.reset()
+
+    def reset(self):
+        self.state = 'armed'        # 'armed', 'capture', 'holdoff'
+        self.last = None            # previous power
+        self.mean = None            # for 'deviation'
+        self.last_mono = None
+        self.fired = 0              # times the trigger fired
+        self.latency = 0.0          # seconds from the sample to fast mode
+
+    def condition(self, p):
+        kind = self.kind
+        if kind == 'below':
+            return p < self.level
+        if kind == 'above':
+            return p > self.level
+        if kind == 'falling':
+            return self.last is not None and self.last >= self.level > p
+        if kind == 'rising':
+            return self.last is not None and self.last <= self.level < p
+        return self.mean is not None \
+            and abs(p - self.mean) > self.deviation*abs(self.mean)
+
+    def feed(self, tim, mono, p, tmp):
+        "a new sample, called by the measurement thread"
+        self.ring.publish(tim, mono, p, tmp)
+        if self.state == 'armed':
+            if self.condition(p):
+                self.fire(tim, mono)
+        elif self.state == 'capture':
+            if mono - self.t_fire >= self.post:
+                self.finish(mono)
+        elif mono - self.t_end >= self.holdoff:
+            self.state = 'armed'
+        if self.state != 'capture':
+            # the mean follows the signal, but not the event itself
+            if self.mean is None:
+                self.mean = p
+            elif self.last_mono is not None:
+                a = 1.0 - math.exp(-(mono - self.last_mono)/self.tau)
+                self.mean += a*(p - self.mean)
+        self.last = p
+        self.last_mono = mono
+
+    def main_sample(self, mono):
+        "whether the sample (just fed) also goes to the main recording"
+        if self.state != 'capture':
+            return True
+        if mono < self.next_main:
+            return False
+        self.next_main += self.saved[0]
+        if self.next_main < mono:
+            self.next_main = mono + self.saved[0]
+        return True
+
+    def fire(self, tim, mono):
+        self.state = 'capture'
+        self.fired += 1
+        self.t_fire = mono
+        self.tim_fire = tim
+        self.next_main = mono
+        meas = self.meas
+        self.saved = (meas.period, meas.average, meas.temp_every, meas.temp_interval)
+        if self.fast_period is not None:
+            meas.period = min(meas.period, self.fast_period)
+        meas.temp_every = 0
+        meas.temp_interval = None
+        if self.fast_average is not None and meas.average != self.fast_average:
+            meas.apply_config({'average': self.fast_average})
+        self.latency = time.monotonic() - mono
+
+    def finish(self, mono, partial=False):
+        meas = self.meas
+        period, average, meas.temp_every, meas.temp_interval = self.saved
+        meas.period = period
+        if meas.average != average:
+            try:
+                meas.apply_config({'average': average})
+            except (OSError, ValueError, TimeoutError):
+                pass  # meas.average is set: applied again on reconnect
+        self.state = 'holdoff'
+        self.t_end = mono
+        rec = self.ring.snapshot()[1]
+        rec = rec[(rec['mono'] >= self.t_fire - self.pre) & (rec['mono'] <= mono)]
+        info = self.info()
+        info['partial'] = partial
+        writer = threading.Thread(target=self.write, args=(rec, info))
+        writer.daemon = True
+        self.writers = [w for w in self.writers if w.is_alive()] + [writer]
+        writer.start()
+
+    def info(self):
+        return {'kind': self.kind, 'level': self.level,
+                'deviation': self.deviation, 'mean': self.mean,
+                'pre': self.pre, 'post': self.post, 'time': self.tim_fire,
+                'fast_period': self.fast_period,
+                'fast_average': self.fast_average, 'latency': self.latency}
+
+    def flush(self):
+        "end a capture cut short by a stop: restore and write what was taken"
+        if self.state == 'capture':
+            self.finish(self.last_mono, partial=True)
+
+    def create(self, info):
+        "new event file; events in the same millisecond get a suffix"
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(info['time']))
+        stamp += '_%03d' % (int(info['time']*1000) % 1000)
+        name = os.path.join(self.directory, self.prefix+'_'+stamp)
+        n = 0
+        while True:
+            filename = name + ('_%d' % n if n else '') + '.pmb'
+            try:
+                return filename, open(filename, 'xb')
+            except FileExistsError:
+                n += 1
+
+    def write(self, rec, info):
+        filename, outFile = self.create(info)
+        meta = self.meas.info()
+        meta['trigger'] = info
+        with outFile:
+            writer = BinaryFormat(outFile, rec.dtype)
+            writer.write_header(self.meas.info_header(), meta)
+            writer.write(0, rec)
+        self.events.append(filename)
+        if self.on_event is not None:
+            self.on_event(filename)
+
+    def wait(self):
+        "until the event files are written"
+        for w in self.writers:
+            w.join()
@@ -0,0 +1,233 @@
+#  Benchmarks of the acquisition/display/recording path
+#
+#  2026.10.18 v1.0
+#
+#  Runs headless against the simulated devices (SimUSBTMC) or replays a
+#  binary recording, and prints/saves the results as JSON so that two
+#  versions can be compared:
+#
+#      python3 benchmark.py --out new.json
+#      python3 benchmark.py --compare old.json new.json
+#
+#  get_data   latency of pm100usb.get_data (us)
+#  jitter     deviation of the sample times of timerMeasurement (ms)
+#  draw       cost of GraphPanel.draw for growing histories (ms, needs
+#             PyQt5/pyqtgraph, runs with the offscreen Qt platform)
+#  export     rows/s written by DataRecorder (text and binary)
+#  memory     bytes per sample kept in a long synthetic session
+#
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+
+import SimUSBTMC
+import ThorlabUSBTMC as thorlabs
+import MeasureThorLabs
+from SampleChannel import SampleChannel
+from DataRecorder import DataRecorder
+from SampleStore import record_dtype
+
+
+def percentiles(values, scale=1.0):
+    v = np.asarray(values, dtype=np.float64)*scale
+    return {'n': len(v), 'mean': float(v.mean()),
+            'p50': float(np.percentile(v, 50)),
+            'p90': float(np.percentile(v, 90)),
+            'p99': float(np.percentile(v, 99)),
+            'max': float(v.max())}
+
+
+def synthetic(n, period=0.05, t0=None):
+    "n samples of a noisy 1 mW trace with a few dropouts"
+    if t0 is None:
+        t0 = time.time()
+    rng = np.random.default_rng(0)
+    rec = np.empty(n, dtype=record_dtype)
+    rec['time'] = t0 + np.arange(n)*period
+    rec['mono'] = np.arange(n)*period
+    rec['power'] = 1.0 + 0.001*rng.standard_normal(n)
+    rec['power'][rng.integers(0, n, max(n//100000, 1))] = 0.0
+    rec['temp'] = 25.0
+    return rec
+
+
+def replay(filename, n=None):
+    from BinaryRecord import BinaryReader
+    rec = BinaryReader(filename)
+    if n is None:
+        n = len(rec)
+    return np.array(rec.records[:n])
+
+
+def bench_get_data(n, latency):
+    dev = thorlabs.pm100usb()
+    dev.open(SimUSBTMC.register('sim:bench', SimUSBTMC.SimPM100USB(
+        latency=latency)))
+    lat = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        dev.get_data()
+        lat.append(time.perf_counter() - t0)
+    res = percentiles(lat, 1e6)
+    res.update(dev.transaction_budget())
+    dev.close()
+    return res
+
+
+def bench_jitter(n, period, latency):
+    meas = MeasureThorLabs.PM100USB()
+    meas.period = period
+    meas.open(SimUSBTMC.register('sim:jitter', SimUSBTMC.SimPM100USB(
+        latency=latency)))
+    meas.recording = True
+    meas.startMeasurement(n)
+    meas.measurement_id.join()
+    meas.update_data()
+    dt = np.diff(meas.data.mono)
+    res = percentiles(np.abs(dt - period), 1e3)
+    res['clock'] = meas.timing()
+    meas.close()
+    return res
+
+
+def bench_draw(sizes, data):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PyQt5.QtWidgets import QApplication
+        import pm100usb_qtgui
+    except ImportError as e:
+        return {'skipped': str(e)}
+    app = QApplication.instance() or QApplication(sys.argv)
+    frame = pm100usb_qtgui.MainFrame()
+    frame.render_scheduler.stop()
+    meas = frame.pm100usb
+    meas.recording = True
+    res = {}
+    k = 0
+    for size in sizes:
+        if size + 50 > len(data): # 50 more samples are timed
+            break
+        while k < size:  # grow the history to `size`, drawing as in the GUI
+            m = min(size - k, 100)
+            for i in range(k, k+m):
+                meas.channel.publish(*data[i])
+            meas.update_data()
+            frame.graphpanel.draw()
+            k += m
+        cost = []
+        for i in range(50):
+            meas.channel.publish(*data[k])
+            k += 1
+            t0 = time.perf_counter()
+            meas.update_data()
+            frame.graphpanel.draw()
+            app.processEvents()
+            cost.append(time.perf_counter() - t0)
+        res[str(size)] = percentiles(cost, 1e3)
+    return res
+
+
+def bench_export(data):
+    res = {}
+    tmpdir = tempfile.mkdtemp()
+    for fmt in ('text', 'binary'):
+        fileName = os.path.join(tmpdir, 'bench.'+fmt)
+        rec = DataRecorder(fileName, SampleChannel(2).reader(), ['benchmark'],
+                           [data], fmt)
+        t0 = time.perf_counter()
+        rec.start()
+        rec.stop()
+        dt = time.perf_counter() - t0
+        res[fmt] = {'rows': len(data), 'rows_per_s': len(data)/dt,
+                    'bytes': os.path.getsize(fileName)}
+        os.remove(fileName)
+    os.rmdir(tmpdir)
+    return res
+
+
+def bench_memory(data):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    meas = MeasureThorLabs.PM100USB(capacity=len(data))
+    t0 = time.perf_counter()
+    channel = meas.channel
+    for k in range(0, len(data), 1000):
+        for i in range(k, min(k+1000, len(data))):
+            channel.publish(*data[i])
+        meas.update_data()
+    dt = time.perf_counter() - t0
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = len(meas.data)
+    return {'samples': n, 'samples_per_s': n/dt,
+            'bytes_per_sample': (after - before)/max(n, 1),
+            'peak_bytes': peak - before}
+
+
+def compare(old, new, path=''):
+    "print numeric results of two runs side by side"
+    for key in new:
+        if key not in old or key in ('version', 'time', 'args'):
+            continue
+        a, b = old[key], new[key]
+        if isinstance(b, dict) and isinstance(a, dict):
+            compare(a, b, path+key+'.')
+        elif isinstance(b, (int, float)) and isinstance(a, (int, float)):
+            ratio = b/a if a else float('inf')
+            print('{:<40s} {:>14.4g} {:>14.4g} {:>8.2f}'.format(
+                path+key, a, b, ratio))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='PM100USB benchmarks')
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--period', type=float, default=0.005)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='simulated USB latency (s)')
+    parser.add_argument('--session', type=int, default=1000000,
+                        help='samples of the synthetic session')
+    parser.add_argument('--replay', help='binary recording used as session')
+    parser.add_argument('--only', nargs='*',
+                        default=['get_data', 'jitter', 'draw', 'export',
+                                 'memory'])
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        print('{:<40s} {:>14s} {:>14s} {:>8s}'.format('', 'old', 'new', 'ratio'))
+        compare(old, new)
+        sys.exit(0)
+
+    if args.replay:
+        data = replay(args.replay, args.session)
+    else:
+        data = synthetic(args.session)
+    sizes = [n for n in (1000, 10000, 100000, 1000000) if n < len(data)]
+
+    results = {'version': 1, 'time': time.time(), 'args': vars(args)}
+    benches = {
+        'get_data': lambda: bench_get_data(args.samples, args.latency),
+        'jitter': lambda: bench_jitter(min(args.samples, 1000), args.period,
+                                       args.latency),
+        'draw': lambda: bench_draw(sizes, data),
+        'export': lambda: bench_export(data),
+        'memory': lambda: bench_memory(data),
+    }
+    for name in args.only:
+        print('running', name, '...', file=sys.stderr)
+        results[name] = benches[name]()
+    text = json.dumps(results, indent=1)
+    print(text)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text)
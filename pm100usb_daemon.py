@@ -0,0 +1,189 @@
+#  Headless PM100USB acquisition (no Qt)
+#
+#  2026.10.18 v1.0
+#             v1.1 --publish: sample stream on a local socket
+#                  --trigger: event capture (Trigger)
+#                  --tsp01: temperature/humidity recorded alongside
+#                  stops with exit status 1 on a write error of a recorder
+#
+#  Opens the device, measures every period and records to a data file
+#  until the count is reached, the duration is over or it is stopped
+#  with Ctrl-C / SIGTERM.  The GUI can show a running acquisition:
+#
+#      python3 pm100usb_daemon.py --period 0.05 run.pmb
+#      python3 pm100usb_qtgui.py --attach run.pmb
+#
+#  The GUI follows binary .pmb files (text files are for reading only).
+#  The samples can also be served on a local socket to any number of
+#  viewers, loggers and control scripts (see SampleStream):
+#
+#      python3 pm100usb_daemon.py --publish unix:/tmp/pm100usb.sock run.txt
+#      python3 pm100usb_qtgui.py --attach unix:/tmp/pm100usb.sock
+#
+import argparse
+import signal
+import sys
+import time
+import MeasureThorLabs
+from Trigger import Trigger
+from SampleStream import parse_address
+
+verinfo = 'pm100usb_daemon v1.1(20261018)'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless PM100USB acquisition')
+    parser.add_argument('output', nargs='?',
+                        help='data file (.pmb: binary, else text)')
+    parser.add_argument('--publish', metavar='ADDRESS',
+                        help='sample stream: unix:/path, tcp:port or tcp:127.0.0.1:port')
+    parser.add_argument('--device', help='e.g. /dev/usbtmc0 (default: first PM100USB)')
+    parser.add_argument('--period', type=float, default=1.0, help='seconds')
+    parser.add_argument('--wavelength', type=int)
+    parser.add_argument('--average', type=int)
+    parser.add_argument('--bw', type=int, choices=(0, 1), help='1: low bandwidth')
+    parser.add_argument('--count', type=int, default=0, help='samples (0: endless)')
+    parser.add_argument('--duration', type=float, help='seconds')
+    parser.add_argument('--overrun', default='skip',
+                        choices=('skip', 'catchup', 'stretch'))
+    parser.add_argument('--reset', action='store_true', help='send *RST on connect')
+    parser.add_argument('--status', type=float, default=10.0,
+                        help='seconds between status lines (0: none)')
+    parser.add_argument('--trigger', metavar='KIND:VALUE',
+                        help='below/above/falling/rising:level (mW) or deviation:fraction')
+    parser.add_argument('--pre', type=float, default=1.0,
+                        help='seconds recorded before a trigger')
+    parser.add_argument('--post', type=float, default=1.0,
+                        help='seconds captured (fast) after a trigger')
+    parser.add_argument('--events', default='.', help='directory of the event files')
+    parser.add_argument('--tsp01', metavar='OUTPUT',
+                        help='record a TSP01 in parallel to this file')
+    parser.add_argument('--tsp01-device', help='default: first TSP01')
+    parser.add_argument('--tsp01-period', type=float, default=10.0, help='seconds')
+    parser.add_argument('--simulate', action='store_true',
+                        help='simulated devices instead of /dev/usbtmc*')
+    args = parser.parse_args(argv)
+
+    # check the arguments before any device is touched
+    if args.output is None and args.publish is None and args.trigger is None:
+        parser.error('an output file, --publish and/or --trigger is needed')
+    if args.trigger is not None:
+        kind, sep, value = args.trigger.partition(':')
+        if kind not in Trigger.kinds:
+            parser.error('--trigger: unknown condition '+kind)
+        try:
+            value = float(value)
+        except ValueError:
+            parser.error('--trigger: KIND:VALUE expected')
+    if args.publish is not None:
+        try:
+            parse_address(args.publish)
+        except ValueError as e:
+            parser.error('--publish: '+str(e))
+
+    if args.simulate:
+        import SimUSBTMC
+        SimUSBTMC.install()
+        if args.device is None:
+            args.device = 'sim:pm100usb0'
+
+    meas = MeasureThorLabs.PM100USB()
+    meas.period = args.period
+    meas.overrun = args.overrun
+    if args.wavelength is not None:
+        meas.wavelength = args.wavelength
+    if args.average is not None:
+        meas.average = args.average
+    if args.bw is not None:
+        meas.bw = args.bw
+    if not meas.open(args.device, reset=args.reset):
+        print('PM100USB not found', file=sys.stderr)
+        return 1
+
+    env = None
+    if args.tsp01 is not None:
+        if args.simulate and args.tsp01_device is None:
+            args.tsp01_device = 'sim:tsp010'
+        env = MeasureThorLabs.TSP01()
+        env.period = args.tsp01_period
+        if not env.open(args.tsp01_device):
+            print('TSP01 not found', file=sys.stderr)
+            meas.close()
+            return 1
+        env.recording = True
+        fmt = 'binary' if args.tsp01.endswith('.pmb') else 'text'
+        env_recorder = env.start_recorder(args.tsp01, [verinfo], history=False, fmt=fmt)
+
+    if args.trigger is not None:
+        if kind == 'deviation':
+            meas.trigger = Trigger(meas, kind, deviation=value, pre=args.pre,
+                                   post=args.post, directory=args.events)
+        else:
+            meas.trigger = Trigger(meas, kind, level=value, pre=args.pre,
+                                   post=args.post, directory=args.events)
+        meas.trigger.on_event = lambda filename: print('event', filename, flush=True)
+    meas.recording = True
+    recorder = None
+    if args.output is not None:
+        fmt = 'binary' if args.output.endswith('.pmb') else 'text'
+        recorder = meas.start_recorder(args.output, [verinfo], history=False, fmt=fmt)
+    publisher = None
+    if args.publish is not None:
+        publisher = meas.start_publisher(args.publish)
+
+    stop = []
+    def onSignal(signum, frame):
+        stop.append(signum)
+    signal.signal(signal.SIGINT, onSignal)
+    signal.signal(signal.SIGTERM, onSignal)
+
+    print(meas.info_header()[0], '->', args.output or args.publish or args.events, flush=True)
+    t0 = time.monotonic()
+    last_status = t0
+    meas.startMeasurement(args.count if args.count > 0 else -1)
+    if env is not None:
+        env.startMeasurement(-1)
+    while meas.measurement and not stop:
+        time.sleep(0.1)
+        now = time.monotonic()
+        if args.duration is not None and now - t0 >= args.duration:
+            break
+        if (recorder is not None and recorder.error is not None) or \
+           (env is not None and env_recorder.error is not None):
+            break
+        if args.status and now - last_status >= args.status:
+            last_status = now
+            clock = meas.timing()
+            print('{} samples  {:.4g} mW  {:.1f} C  missed {}  lost {}  subscribers {}'.format(
+                meas.measured, meas.current_power, meas.current_temp,
+                clock['missed'], recorder.lost if recorder else 0,
+                len(publisher.subscribers) if publisher else 0), flush=True)
+
+    status = 0
+    meas.stopMeasurement()
+    if recorder is not None:
+        status |= stop_recorder(recorder)
+    if publisher is not None:
+        publisher.stop()
+    if meas.trigger is not None:
+        meas.trigger.wait()
+    if env is not None:
+        env.stopMeasurement()
+        status |= stop_recorder(env_recorder)
+        env.close()
+    meas.close()
+    print(meas.measured, 'samples', flush=True)
+    return status
+
+
+def stop_recorder(recorder):
+    try:
+        recorder.stop()
+    except Exception as e:
+        print(recorder.filename+':', 'recording stopped:', e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
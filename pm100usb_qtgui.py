@@ -4,6 +4,11 @@
 #                   start/stop button means recording now
 #                   The program is always showing the count rate
 #                   when it connects the device
+#  2026.10.18 v1.1  --attach: viewer of a running pm100usb_daemon
+#                   running statistics in the data panel
+#                   Allan deviation view
+#                   noise spectrum view
+#                   --devices: several devices polled in parallel
 #
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
@@ -21,70 +26,57 @@ import MeasureThorLabs
 import ThorlabUSBTMC as thorlabs
 from ThorlabUSBTMC import list_thorlabs_devinfo
 import MeasureThorLabs as measThorlabs
+from RunningStats import SlidingMinMax
+from Decimation import MinMaxPyramid
+# Stability and Spectrum are imported when their view is opened
 
 verinfo = 'pm100usb_qtgui (PyQt5) v1.01(20201215)'
 
-# PM100USB measurement event
-class UpDateEvent( QObject):
-    update = pyqtSignal(int)
-    
+# GUI refresh: the window is redrawn at most max_fps times per second,
+# however short the measurement period is.  All samples measured since
+# the last frame are drawn at once.
+class RenderScheduler( QObject):
+    def __init__(self, gui_win, max_fps=30):
+        super().__init__()
+        self.gui_win = gui_win
+        self.last_count = -1
+        self.timer = QTimer()
+        self.timer.timeout.connect( self.onTimer)
+        self.setRate( max_fps)
+
+    def setRate(self, max_fps):
+        self.max_fps = max_fps
+        self.timer.setInterval( int(1000/max_fps))
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def onTimer(self):
+        count = self.gui_win.pm100usb.measured
+        if count != self.last_count: # only when new data arrived
+            self.last_count = count
+            self.gui_win.onUpdate( count)
 
 # PM100USB measurement (wrapper for PyQt5)
 class PM100USB_Measure( MeasureThorLabs.PM100USB):
     def __init__ (self, gui_win):
         super(PM100USB_Measure, self).__init__()
         self.gui_win = gui_win # keep parent window ID
-        self.num = 0
-        self.UpDateEvent = UpDateEvent()
-                    
-    def timerMeasurement(self, num):       
-        next_call = time.time() # the initial time
-        while self.measurement and num!=0:
-            next_call = next_call + self.period
-            try:
-                time.sleep(next_call - time.time())
-            except:
-                pass
-            self.measure()
-            self.UpDateEvent.update.emit( len(self.power))
-            if num>0:
-                num -=1
-        self.measurement = False
-        self.num = num
-        
-    def startMeasurement(self, num=1):
-        if self.active:              # check device connected
-            if not self.measurement: # check other measurement process
-                self.measurement = True
-                self.measure()  # the first data
-                num -= 1
-                if num!=0: # continue measurement in different thread
-                    self.measurement_id=threading.Thread(
-                        target=self.timerMeasurement,
-                        args=([num])
-                    )
-                    self.measurement_id.daemon = True
-                    self.UpDateEvent.update.connect(self.onUpdate)
-                    self.measurement_id.start()
-
-                else:
-                    self.measurement = False
-
-    def onUpdate(self, value):
-        self.gui_win.onUpdate(value)
-
-    def stopMeasurement(self):
-        if self.measurement:
-            self.measurement = False
-            try:
-                self.measurement_id
-                self.measurement_id.join()
-            except NameError:
-                pass
 
-    def continueMeasurement(self):
-        if self.active and not self.measurement:
-            self.startMeasurement( self.num)
+# samples of a running pm100usb_daemon read from its binary data file
+class PM100USB_Follow( MeasureThorLabs.PM100USBFollower):
+    def __init__ (self, gui_win):
+        super(PM100USB_Follow, self).__init__()
+        self.gui_win = gui_win
+
+# several devices polled in parallel, merged into one stream
+class PM100USB_Group( MeasureThorLabs.PM100USBGroup):
+    def __init__ (self, gui_win, devices):
+        super(PM100USB_Group, self).__init__(devices)
+        self.gui_win = gui_win
 
 # Console for PM100USB: display data and some information
 #
@@ -118,6 +110,7 @@ class PM100USB_Cont(QWidget):
         
     def InitDataPanel(self):
         self.datapanel_layout = QGridLayout()
+        self.label_text = {} # text shown on each indicator
         # main power indicator
         self.power_text = QLabel('')
         self.changeFontSize( self.power_text, 32)
@@ -127,25 +120,32 @@ class PM100USB_Cont(QWidget):
         self.powerunit_text = QLabel('')
         self.changeFontSize( self.powerunit_text, 24)
         self.powerunit_text.setFixedWidth(50)
+        self.powerunit_text.setAlignment(Qt.AlignLeft)
         
         # Max/Min/Temp indicator
 
         self.max_label = QLabel('max')
         self.max_label.setAlignment(Qt.AlignRight)
+        self.max_label.setToolTip('maximum of the last minute')
         self.max_text = QLabel('')
         self.changeFontSize( self.max_text, 12)
         self.max_text.setStyleSheet('background-color: white')
         self.max_text.setFixedWidth(60)
+        self.max_text.setAlignment(Qt.AlignRight)
         self.maxunit_text = QLabel('')
+        self.maxunit_text.setAlignment(Qt.AlignLeft)
         self.changeFontSize( self.maxunit_text, 12)
         
         self.min_label = QLabel('min')
         self.min_label.setAlignment(Qt.AlignRight)
+        self.min_label.setToolTip('minimum of the last minute')
         self.min_text = QLabel('')
         self.changeFontSize( self.min_text, 12)
         self.min_text.setStyleSheet('background-color: white')
         self.min_text.setFixedWidth(60)
+        self.min_text.setAlignment(Qt.AlignRight)
         self.minunit_text = QLabel('')
+        self.minunit_text.setAlignment(Qt.AlignLeft)
         self.changeFontSize( self.minunit_text, 12)
         
         self.temp_label = QLabel('T')
@@ -154,10 +154,27 @@ class PM100USB_Cont(QWidget):
         self.changeFontSize( self.temp_text, 12)
         self.temp_text.setStyleSheet('background-color: white')
         self.temp_text.setFixedWidth(40)    
+        self.temp_text.setAlignment(Qt.AlignRight)
         self.tempunit_text = QLabel('C')
         self.changeFontSize( self.tempunit_text, 12)
         self.tempunit_text.setAlignment(Qt.AlignLeft)
 
+        # running statistics of the power
+        self.stat_text = {}
+        for key,name in (('mean','mean'), ('std','std'), ('p2p','p-p'),
+                         ('rms_noise','noise'), ('drift','drift')):
+            label = QLabel(name)
+            label.setAlignment(Qt.AlignRight)
+            text = QLabel('')
+            self.changeFontSize( text, 12)
+            text.setStyleSheet('background-color: white')
+            text.setFixedWidth(60)
+            text.setAlignment(Qt.AlignRight)
+            unit = QLabel('')
+            self.changeFontSize( unit, 12)
+            unit.setAlignment(Qt.AlignLeft)
+            self.stat_text[key] = (label, text, unit)
+
         self.UpdateDataPanel( [0,0,0,0])
 
         self.datapanel_layout.addWidget( self.power_text, 0,0,-1,1, Qt.AlignVCenter|Qt.AlignLeft)
@@ -171,6 +188,12 @@ class PM100USB_Cont(QWidget):
         self.datapanel_layout.addWidget( self.temp_label, 2,3, Qt.AlignTop |Qt.AlignLeft)
         self.datapanel_layout.addWidget( self.temp_text, 2,4, Qt.AlignCenter)
         self.datapanel_layout.addWidget( self.tempunit_text, 2,5, Qt.AlignLeft|Qt.AlignVCenter)
+        for i,key in enumerate(('mean', 'std', 'p2p', 'rms_noise', 'drift')):
+            label, text, unit = self.stat_text[key]
+            col = 6 + 3*(i//3)
+            self.datapanel_layout.addWidget( label, i%3,col, Qt.AlignTop |Qt.AlignLeft)
+            self.datapanel_layout.addWidget( text, i%3,col+1, Qt.AlignCenter)
+            self.datapanel_layout.addWidget( unit, i%3,col+2, Qt.AlignLeft|Qt.AlignVCenter)
 
     # power unit
     def power_unit( self, pw):
@@ -185,27 +208,46 @@ class PM100USB_Cont(QWidget):
             return pw,'mW'
         return pw/1000.0,'W '
 
+    # setText makes Qt relayout the label, so skip unchanged text
+    def setLabelText(self, label, text):
+        if self.label_text.get(label) != text:
+            self.label_text[label] = text
+            label.setText(text)
+
     def UpdateDataPanel(self, data):
         r = self.power_unit( data[0])        
-        self.power_text.setText('{:>8.2f}'.format(r[0]))
-        self.powerunit_text.setText(r[1])
-        self.power_text.setAlignment(Qt.AlignRight)
-        self.powerunit_text.setAlignment(Qt.AlignLeft)
+        self.setLabelText( self.power_text, '{:>8.2f}'.format(r[0]))
+        self.setLabelText( self.powerunit_text, r[1])
         
         r = self.power_unit( data[2])
-        self.max_text.setText('{:>8.2f}'.format(r[0]))
-        self.maxunit_text.setText(r[1])
-        self.max_text.setAlignment(Qt.AlignRight)
-        self.maxunit_text.setAlignment(Qt.AlignLeft)
+        self.setLabelText( self.max_text, '{:>8.2f}'.format(r[0]))
+        self.setLabelText( self.maxunit_text, r[1])
         
         r = self.power_unit( data[1])        
-        self.min_text.setText('{:>8.2f}'.format(r[0]))
-        self.minunit_text.setText(r[1])
-        self.min_text.setAlignment(Qt.AlignRight)
-        self.minunit_text.setAlignment(Qt.AlignLeft)
+        self.setLabelText( self.min_text, '{:>8.2f}'.format(r[0]))
+        self.setLabelText( self.minunit_text, r[1])
         
-        self.temp_text.setText('{:5.1f}'.format(data[3]))
-        self.temp_text.setAlignment(Qt.AlignRight)
+        self.setLabelText( self.temp_text, '{:5.1f}'.format(data[3]))
+
+    # stats: RunningStats.results() of the power (mW)
+    def UpdateStatsPanel(self, stats):
+        if stats['count'] == 0:
+            for label, text, unit in self.stat_text.values():
+                self.setLabelText( text, '')
+                self.setLabelText( unit, '')
+            return
+        for key in ('mean', 'std', 'p2p'):
+            label, text, unit = self.stat_text[key]
+            r = self.power_unit( stats[key])
+            self.setLabelText( text, '{:>8.3f}'.format(r[0]))
+            self.setLabelText( unit, r[1])
+        label, text, unit = self.stat_text['rms_noise']
+        self.setLabelText( text, '{:>7.3f}'.format(stats['rms_noise']*100))
+        self.setLabelText( unit, '%')
+        label, text, unit = self.stat_text['drift']
+        r = self.power_unit( stats['drift']*3600)
+        self.setLabelText( text, '{:>8.3f}'.format(r[0]))
+        self.setLabelText( unit, r[1].strip()+'/h')
 
     def meas_buttons_init(self):
         # Measurement Start/Stop/Clear Button
@@ -401,7 +443,7 @@ class PM100USB_Configuration_Frame( QDialog):
             self.dev_list = list_thorlabs_devinfo('PM100USB')
             idx = 0
             for d in self.dev_list:
-                if d.split(':')[0]!= self.dev[0]:
+                if re.split(r' |:\(', d)[0]!= self.dev[0]:
                     idx +=1
             if idx>=len(self.dev_list):
                 idx = 0
@@ -491,7 +533,7 @@ class PM100USB_Configuration_Frame( QDialog):
         # read input and set them as the configuration parameters
         if len(self.dev_list)!=0:
             dn =self.dev_list[self.device_selection.currentIndex()]
-            dn = re.split('[ :]', dn)[0] # only take device name
+            dn = re.split(r' |:\(', dn)[0] # only take device name
         else:
             dn = self.dev[0]
         wl = int(self.wavelength_input.text())
@@ -521,6 +563,12 @@ class GraphPanel(QWidget):
         #
         self.parent = parent
         self.maximumData = 1200
+        # y range of the visible window, updated only with the new samples
+        self.minmax = SlidingMinMax( self.maximumData)
+        # min/max envelope of the whole session for zoomed out views
+        self.pyramid = MinMaxPyramid()
+        self.drawn = 0  # samples of the history fed to minmax/pyramid
+        self.follow = True # show the latest data, otherwise the zoomed range
         
         # plot panel setup
         self.figure = pg.PlotWidget(axisItems={'bottom': TimeAxisItem(orientation='bottom')})
@@ -534,34 +582,74 @@ class GraphPanel(QWidget):
 
         self.pen1 = pg.mkPen( color=(255, 0 , 0), width=0.5)
         self.curve = self.figure.plot(pen=self.pen1)
+        self.extra_curves = {} # power of the other heads (--devices)
         
         self.initDraw()
 
+        # zooming with mouse switches to the history view
+        viewbox = self.figure.getViewBox()
+        viewbox.sigRangeChangedManually.connect( self.onZoom)
+        viewbox.sigXRangeChanged.connect( self.onXRange)
+
+        self.followCheck = QCheckBox('Follow')
+        self.followCheck.setChecked(True)
+        self.followCheck.clicked.connect( self.onFollow)
+        wholeButton = QPushButton('Whole')
+        wholeButton.clicked.connect( self.onWhole)
+        viewlayout = QHBoxLayout()
+        viewlayout.addStretch()
+        viewlayout.addWidget( self.followCheck)
+        viewlayout.addWidget( wholeButton)
+
         self.graphlayout = QVBoxLayout()
         self.graphlayout.addWidget(self.figure)
+        self.graphlayout.addLayout( viewlayout)
         self.setLayout( self.graphlayout)
 
     def initDraw(self):
         self.curve.setData([0],[0]) 
+        for curve in self.extra_curves.values():
+            curve.setData([],[])
+        self.minmax.clear()
+        self.pyramid.clear()
+        self.drawn = 0
+
+    # feed the samples added since the last draw to the sliding min/max
+    # and to the envelope pyramid
+    def updateMinMax(self):
+        data = self.parent.pm100usb.data
+        if data.total < self.drawn: # history was cleared
+            self.minmax.clear()
+            self.pyramid.clear()
+            self.drawn = 0
+        new = min( data.total - self.drawn, len(data))
+        if new > 0:
+            # NaN: the first head of a group gave no sample
+            tim, power = data.time[len(data)-new:], data.power[len(data)-new:]
+            ok = np.isfinite( power)
+            self.pyramid.extend( tim[ok], power[ok])
+            # older ones fall out of the window anyway
+            new = min( new, self.maximumData)
+            power = power[len(power)-new:]
+            self.minmax.extend( power[np.isfinite( power)].tolist())
+        self.drawn = data.total
        
     def draw(self):       
+        self.updateMinMax()
+        if not self.follow:
+            self.drawHistory()
+            return
         idx = len(self.parent.pm100usb.power)
-        
-        if idx > self.maximumData:
-            xmax_idx = idx-1
-            xmin_idx = idx - self.maximumData
-        else:
-            xmax_idx = self.maximumData-1
-            xmin_idx = 0
+        xmin_idx = max( idx - self.maximumData, 0)
 
-        if idx<2:
+        if idx<2 or self.minmax.min is None:
             ymin = -0.1
             ymax = 0.1
             now = datetime.datetime.now()
             xmin = datetime.datetime.timestamp(datetime.datetime(*now.timetuple()[:6]))
         else:
-            ymin = min(self.parent.pm100usb.power[xmin_idx:idx])
-            ymax = max(self.parent.pm100usb.power[xmin_idx:idx])
+            ymin = self.minmax.min
+            ymax = self.minmax.max
             if ymin==ymax:
                 ymax = ymin + 0.1
             xm = datetime.datetime.fromtimestamp(self.parent.pm100usb.time[xmin_idx])
@@ -571,9 +659,94 @@ class GraphPanel(QWidget):
         self.figure.setXRange(xmin, xmax)
         self.figure.setYRange(ymin, ymax)
                
-        if idx>0:        
-            self.curve.setData(self.parent.pm100usb.time[1:xmax_idx], np.array(self.parent.pm100usb.power[1:xmax_idx]))
+        if idx>0: # only the visible window, as views of the history
+            self.curve.setData(self.parent.pm100usb.time[xmin_idx:idx], self.parent.pm100usb.power[xmin_idx:idx])
+        else:
+            self.curve.setData([0],[0])
+        self.drawExtra( xmin_idx, idx, ymin, ymax)
+
+    # the other power columns of the merged rows, same window
+    def drawExtra(self, i0, i1, ymin, ymax):
+        data = self.parent.pm100usb.data
+        colors = [(0, 160, 255), (0, 220, 0), (255, 200, 0), (220, 0, 220)]
+        for name in data.dtype.names:
+            if not name.startswith('power') or name=='power':
+                continue
+            curve = self.extra_curves.get(name)
+            if curve is None:
+                color = colors[len(self.extra_curves) % len(colors)]
+                curve = self.figure.plot(pen=pg.mkPen( color=color, width=0.5))
+                self.extra_curves[name] = curve
+            y = data.column(name)[i0:i1]
+            if i1-i0>0 and np.isfinite(y).any():
+                curve.setData( data.time[i0:i1], y)
+                ymin = min( ymin, float(np.nanmin(y)))
+                ymax = max( ymax, float(np.nanmax(y)))
+            else:
+                curve.setData([],[])
+        if self.extra_curves and i1-i0>1:
+            self.figure.setYRange(ymin, ymax)
       
+    # zoomed view: raw samples if they are few enough, otherwise
+    # about one min/max bucket of the pyramid per pixel
+    def drawHistory(self):
+        xmin, xmax = self.figure.viewRange()[0]
+        npix = max( int(self.figure.width()), 100)
+        data = self.parent.pm100usb.data
+        i0 = np.searchsorted( data.time, xmin)
+        i1 = np.searchsorted( data.time, xmax, side='right')
+        raw = len(data)>0 and data.time[0]<=xmin and i1-i0<=2*npix
+        if raw:
+            x, y = data.time[i0:i1], data.power[i0:i1]
+            ok = np.isfinite( y)
+            if not ok.all():
+                x, y = x[ok], y[ok]
+        else:
+            x, y = self.pyramid.query( xmin, xmax, npix)
+        if len(x)>0:
+            self.curve.setData( x, y)
+            ymin, ymax = float(y.min()), float(y.max())
+            if ymin==ymax:
+                ymax = ymin + 0.1
+            self.figure.setYRange( ymin, ymax)
+            if raw: # the other heads only where the raw samples are drawn
+                self.drawExtra( i0, i1, ymin, ymax)
+            else:
+                self.drawExtra( 0, 0, ymin, ymax)
+        else:
+            self.curve.setData([0],[0])
+
+    def onZoom(self, *args):
+        self.setFollow( False)
+
+    def onXRange(self, *args):
+        if not self.follow:
+            self.drawHistory()
+
+    def onFollow(self, checked):
+        self.setFollow( checked)
+
+    def onWhole(self, event):
+        self.updateMinMax()
+        data = self.parent.pm100usb.data
+        if self.pyramid.levels[0].n>0:
+            tmin = self.pyramid.levels[0].t0[0]
+        elif len(data)>0:
+            tmin = data.time[0]
+        else:
+            return
+        if len(data)>0:
+            tmax = data.time[-1]
+        else:
+            tmax = self.pyramid.levels[0].t1[self.pyramid.levels[0].n-1]
+        self.setFollow( False)
+        self.figure.setXRange( tmin, tmax)
+
+    def setFollow(self, follow):
+        self.follow = follow
+        self.followCheck.setChecked( follow)
+        self.draw()
+
     def upDate(self):
         self.draw()
 
@@ -583,8 +756,166 @@ class GraphPanel(QWidget):
         else:
             self.figure.setTitle('PM100USB')
         
+# Allan deviation of the power recorded so far (relative to the mean)
+class StabilityPanel(QWidget):
+    def __init__(self, parent=None):
+        super(StabilityPanel, self).__init__()
+        self.parent = parent
+        self.setWindowTitle('PM100USB Stability')
+        self.result = None
+
+        self.figure = pg.PlotWidget()
+        self.figure.setLogMode( x=True, y=True)
+        self.figure.setLabel('left', 'Allan deviation (relative)')
+        self.figure.setLabel('bottom', 'Averaging time (s)')
+        self.figure.setBackground('k')
+        self.figure.showGrid( x=True, y=True)
+        self.figure.addLegend()
+        self.adev_curve = self.figure.plot( pen=pg.mkPen( color=(255, 0, 0)),
+                                            symbol='o', symbolSize=5, name='overlapping')
+        self.mdev_curve = self.figure.plot( pen=pg.mkPen( color=(0, 160, 255)),
+                                            symbol='t', symbolSize=5, name='modified')
+
+        self.info_text = QLabel('')
+        updateButton = QPushButton('Update')
+        updateButton.clicked.connect( self.onUpdate)
+        saveButton = QPushButton('Save')
+        saveButton.clicked.connect( self.onSave)
+        buttonlayout = QHBoxLayout()
+        buttonlayout.addWidget( self.info_text)
+        buttonlayout.addStretch()
+        buttonlayout.addWidget( updateButton)
+        buttonlayout.addWidget( saveButton)
+
+        layout = QVBoxLayout()
+        layout.addWidget( self.figure)
+        layout.addLayout( buttonlayout)
+        self.setLayout( layout)
+        self.resize( 600, 450)
+
+    def onUpdate(self, event=None):
+        import Stability
+        pm100usb = self.parent.pm100usb
+        pm100usb.update_data()
+        blocks = pm100usb.data.snapshot() # spilled part stays on disk
+        tau0 = Stability.sample_interval([b['mono'] for b in blocks]) \
+               or pm100usb.period
+        QApplication.setOverrideCursor( Qt.WaitCursor)
+        try:
+            self.result = Stability.stability([b['power'] for b in blocks], tau0)
+        finally:
+            QApplication.restoreOverrideCursor()
+        r = self.result
+        if len(r['tau'])>0:
+            self.adev_curve.setData( r['tau'], r['adev'])
+        if len(r['tau_mod'])>0:
+            self.mdev_curve.setData( r['tau_mod'], r['mdev'])
+        n = sum( len(b) for b in blocks)
+        self.info_text.setText('{} samples, {:.3g} s, mean {:.4g} mW'.format(
+            n, tau0, r['mean']))
+
+    def onSave(self, event):
+        if self.result is None:
+            return
+        fileName, choice = QFileDialog.getSaveFileName(self, 'Save Allan Deviation as ...',
+                                                       self.parent.previousDir,
+                                                       "Text (*.txt) ;; All (*.*)", 'adev.txt')
+        if len(fileName)!= 0:
+            r = self.result
+            with open( fileName, 'w') as outFile:
+                outFile.write('# '+verinfo+'\n')
+                for line in self.parent.pm100usb.info_header():
+                    outFile.write('# '+line+'\n')
+                outFile.write('# mean {:.6g} mW\n'.format(r['mean']))
+                outFile.write('# tau adev mdev\n')
+                mdev = dict( zip( r['tau_mod'], r['mdev']))
+                for tau, adev in zip( r['tau'], r['adev']):
+                    outFile.write('{:.6g} {:.6g} {}\n'.format(
+                        tau, adev, '{:.6g}'.format(mdev[tau]) if tau in mdev else 'nan'))
+
+# power spectral density of the recorded power, updated with the new
+# samples only (Spectrum.WelchPSD)
+class SpectrumPanel(QWidget):
+    def __init__(self, parent=None):
+        super(SpectrumPanel, self).__init__()
+        self.parent = parent
+        self.setWindowTitle('PM100USB Noise Spectrum')
+        self.reader = self.parent.pm100usb.channel.reader()
+        self.welch = None
+
+        self.figure = pg.PlotWidget()
+        self.figure.setLogMode( x=False, y=True)
+        self.figure.setLabel('left', 'PSD (mW^2/Hz)')
+        self.figure.setLabel('bottom', 'Frequency (Hz)')
+        self.figure.setBackground('k')
+        self.figure.showGrid( x=True, y=True)
+        self.curve = self.figure.plot( pen=pg.mkPen( color=(255, 0, 0), width=0.5))
+
+        self.info_text = QLabel('')
+        self.nperseg = QComboBox()
+        self.nperseg.addItems( [str(1<<k) for k in range(6, 15)])
+        self.nperseg.setCurrentText('1024')
+        self.nperseg.currentIndexChanged.connect( self.onClear)
+        clearButton = QPushButton('Clear')
+        clearButton.clicked.connect( self.onClear)
+        saveButton = QPushButton('Save')
+        saveButton.clicked.connect( self.onSave)
+        buttonlayout = QHBoxLayout()
+        buttonlayout.addWidget( self.info_text)
+        buttonlayout.addStretch()
+        buttonlayout.addWidget( QLabel('segment'))
+        buttonlayout.addWidget( self.nperseg)
+        buttonlayout.addWidget( clearButton)
+        buttonlayout.addWidget( saveButton)
+
+        layout = QVBoxLayout()
+        layout.addWidget( self.figure)
+        layout.addLayout( buttonlayout)
+        self.setLayout( layout)
+        self.resize( 600, 450)
+
+    def onClear(self, event=None):
+        self.welch = None
+        self.reader.reset()
+        self.curve.setData([], [])
+        self.info_text.setText('')
+
+    def upDate(self):
+        lost = self.reader.lost
+        seq, rec = self.reader.read()
+        fs = 1.0/self.parent.pm100usb.period
+        if self.welch is None or self.welch.fs != fs:
+            from Spectrum import WelchPSD
+            self.welch = WelchPSD( fs, int(self.nperseg.currentText()))
+        elif self.reader.lost != lost: # no segment across the gap
+            self.welch.buf = self.welch.buf[:0]
+        if len(rec)==0 or self.welch.extend( rec['power'])==0:
+            return
+        f, p = self.welch.psd()
+        self.curve.setData( f[1:], p[1:]) # no DC on the log scale
+        self.info_text.setText('{} segments, {:.3g} Hz resolution'.format(
+            self.welch.segments, f[1]))
+
+    def onSave(self, event):
+        if self.welch is None or self.welch.segments==0:
+            return
+        fileName, choice = QFileDialog.getSaveFileName(self, 'Save Spectrum as ...',
+                                                       self.parent.previousDir,
+                                                       "Text (*.txt) ;; All (*.*)", 'psd.txt')
+        if len(fileName)!= 0:
+            f, p = self.welch.psd()
+            with open( fileName, 'w') as outFile:
+                outFile.write('# '+verinfo+'\n')
+                for line in self.parent.pm100usb.info_header():
+                    outFile.write('# '+line+'\n')
+                outFile.write('# Welch PSD: {} segments of {} samples, fs {:.6g} Hz\n'.format(
+                    self.welch.segments, self.welch.nperseg, self.welch.fs))
+                outFile.write('# frequency(Hz) psd(mW^2/Hz)\n')
+                for fi, pi in zip( f, p):
+                    outFile.write('{:.6g} {:.6g}\n'.format(fi, pi))
+
 class MainFrame(QMainWindow):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, attach=None, devices=None, **kwargs):
         super(MainFrame, self).__init__(*args,**kwargs)
 
         self.setWindowTitle('PM100USB Controller (QT)')
@@ -594,7 +925,13 @@ class MainFrame(QMainWindow):
         main_layout = QVBoxLayout()
         self.maincontainer.setLayout( main_layout)      
      
-        self.pm100usb = PM100USB_Measure(self)
+        if devices is not None: # merged stream of several devices
+            self.pm100usb = PM100USB_Group(self, devices)
+        elif attach is None:
+            self.pm100usb = PM100USB_Measure(self)
+        else: # viewer of the file recorded by pm100usb_daemon
+            self.pm100usb = PM100USB_Follow(self)
+            self.pm100usb.dev_name = attach
         self.contpanel = PM100USB_Cont(self)
         self.graphpanel = GraphPanel(self)
         
@@ -604,6 +941,11 @@ class MainFrame(QMainWindow):
         self.setCentralWidget(self.maincontainer)       
         self.InitialFilePath()
 
+        self.render_scheduler = RenderScheduler(self, max_fps=30)
+        self.render_scheduler.start()
+        self.stabilitypanel = None
+        self.spectrumpanel = None
+
     def mainmenubar(self):
         self.menu = self.menuBar()
         self.file = self.menu.addMenu('F&ile')
@@ -612,6 +954,11 @@ class MainFrame(QMainWindow):
         SaveData.setShortcut('Ctrl+S')
         SaveData.setStatusTip('Save Data')
         SaveData.triggered.connect(self.onSaveData)
+
+        self.StopSaving = QtGui.QAction('S&top Saving', self)
+        self.StopSaving.setStatusTip('Stop writing data to the file')
+        self.StopSaving.triggered.connect(self.onStopSaving)
+        self.StopSaving.setEnabled(False)
         
         Destroy = QtGui.QAction('E&xit', self)
         Destroy.setShortcut('Ctrl+X')
@@ -619,7 +966,18 @@ class MainFrame(QMainWindow):
         Destroy.triggered.connect(self.close)
 
         self.file.addAction(SaveData)
+        self.file.addAction(self.StopSaving)
         self.file.addAction(Destroy)
+
+        self.analysis = self.menu.addMenu('A&nalysis')
+        AllanDev = QtGui.QAction('A&llan Deviation', self)
+        AllanDev.setStatusTip('Stability of the recorded power')
+        AllanDev.triggered.connect(self.onStability)
+        self.analysis.addAction(AllanDev)
+        NoiseSpectrum = QtGui.QAction('N&oise Spectrum', self)
+        NoiseSpectrum.setStatusTip('Power spectral density of the recorded power')
+        NoiseSpectrum.triggered.connect(self.onSpectrum)
+        self.analysis.addAction(NoiseSpectrum)
         
     def closeEvent( self, event):
         close = QMessageBox.question(self,
@@ -627,6 +985,12 @@ class MainFrame(QMainWindow):
                                      "Are you sure want to EXIT?",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if close == QMessageBox.Yes:
+            self.render_scheduler.stop()
+            if self.stabilitypanel is not None:
+                self.stabilitypanel.close()
+            if self.spectrumpanel is not None:
+                self.spectrumpanel.close()
+            self.onStopSaving( None)
             self.openclose_pm100usb( False)
             self.close()
         else:
@@ -635,38 +999,50 @@ class MainFrame(QMainWindow):
     def InitialFilePath(self):
         self.previousFile='data.txt'
         self.previousDir=os.getcwd()
+        self.recorder = None
 
     def onSaveData( self, event):
-        fileChoices = "Text (*.txt) ;; All (*.*)"
+        fileChoices = "Text (*.txt) ;; Binary (*.pmb) ;; All (*.*)"
 
-        fileName, _ = QFileDialog.getSaveFileName(self, 'Save Data as ...', self.previousDir, fileChoices, self.previousFile)
+        fileName, choice = QFileDialog.getSaveFileName(self, 'Save Data as ...', self.previousDir, fileChoices, self.previousFile)
         if len(fileName)!= 0:
-            meas = self.pm100usb.measurement
-            if meas:
-                self.pm100usb.stopMeasurement()
-
-            outFile = open( fileName, 'w')
-            outFile.write( '# '+verinfo+'\n')
-            outFile.write( '# '+ self.pm100usb.dev_name \
-                           + ' (' + ','.join(self.pm100usb.device_info)+')\n')
-            outFile.write( '# ' \
-                           + ','.join(self.pm100usb.sensor_info)+'\n')
-            outFile.write( '# WL:'+str(self.pm100usb.wavelength) \
-                           +' AVE:'+str(self.pm100usb.average) \
-                           +' BW:'+str(self.pm100usb.bw) \
-                           +' PERIOD:'+str(self.pm100usb.period) + '\n')
-            for i in range(len(self.pm100usb.power)):
-                tm = datetime.datetime.fromtimestamp(self.pm100usb.time[i])
-                outFile.write(str(i)+' ' \
-                              +tm.strftime('%H:%M:%S.%f')[:11]\
-                              +' '+'{:.4g}'.format(self.pm100usb.power[i]) \
-                              +' '+'{:.1f}'.format(self.pm100usb.temp[i])+'\n')
-            outFile.close()
+            # the recorder thread writes the data taken so far and keeps
+            # appending the new samples until 'Stop Saving'
+            self.onStopSaving( None)
+            if choice.startswith('Binary') or fileName.endswith('.pmb'):
+                fmt = 'binary'
+            else:
+                fmt = 'text'
+            self.recorder = self.pm100usb.start_recorder( fileName, [verinfo], fmt=fmt)
+            self.StopSaving.setEnabled(True)
 
             self.previousDir, self.previousFile = os.path.split(fileName)
 
-            if meas:
-                self.pm100usb.continueMeasurement()
+    def onStability( self, event):
+        if self.stabilitypanel is None:
+            self.stabilitypanel = StabilityPanel(self)
+        self.stabilitypanel.show()
+        self.stabilitypanel.raise_()
+        self.stabilitypanel.onUpdate()
+
+    def onSpectrum( self, event):
+        if self.spectrumpanel is None:
+            self.spectrumpanel = SpectrumPanel(self)
+        elif not self.spectrumpanel.isVisible(): # continue from now
+            self.spectrumpanel.reader.reset()
+            self.spectrumpanel.welch = None
+        self.spectrumpanel.show()
+        self.spectrumpanel.raise_()
+
+    def onStopSaving( self, event):
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            try:
+                recorder.stop()
+            except Exception as e:
+                QMessageBox.warning(self, 'Save Data',
+                                    recorder.filename+'\n'+'recording stopped: '+str(e))
+        self.StopSaving.setEnabled(False)
             
     def get_pm100usb_param( self):
         return [self.pm100usb.dev_name,
@@ -677,26 +1053,24 @@ class MainFrame(QMainWindow):
 
     def set_pm100usb_param( self, params):
         if not self.pm100usb.active:
-            self.pm100usb.dev_name = params[0]
+            # --attach/--devices: the source stays the one given
+            if not isinstance(self.pm100usb, MeasureThorLabs.PM100USBFollower):
+                self.pm100usb.dev_name = params[0]
             self.pm100usb.wavelength = params[1]
             self.pm100usb.average = params[2]
             self.pm100usb.bw = params[3]
             self.pm100usb.period = params[4]/1000
         else:
             if self.pm100usb.dev_name == params[0]:
-                meas = self.pm100usb.measurement
-                if meas:
-                    self.pm100usb.stopMeasurement()
-                if self.pm100usb.wavelength != params[1]:
-                    self.pm100usb.set_wavelength( params[1])
-                if self.pm100usb.average != params[2]:
-                    self.pm100usb.set_average( params[2])
-                if self.pm100usb.bw != params[3]:
-                    self.pm100usb.set_bw( params[3])
+                # one write between two samples
+                try:
+                    self.pm100usb.apply_config( {'wavelength': params[1],
+                                                 'average': params[2],
+                                                 'bw': params[3]})
+                except OSError as e: # unplugged, or busy (TimeoutError)
+                    QMessageBox.warning(self, 'PM100USB Configuration', str(e))
                 if self.pm100usb.period != params[4]/1000:
                     self.pm100usb.period = params[4]/1000
-                if meas:
-                    self.pm100usb.continueMeasurement()               
 
     def isActive_pm100usb( self):
         return self.pm100usb.active
@@ -722,21 +1096,37 @@ class MainFrame(QMainWindow):
             self.pm100usb.stopMeasurement()
 
     def onUpdate( self, value):
-#            idx = value -1
-#            data = [self.pm100usb.power[idx], \
-#                    self.pm100usb.maxmin_power[0],\
-#                    self.pm100usb.maxmin_power[1],\
-#                    self.pm100usb.temp[idx]]
-#            self.contpanel.onUpdate( data)
+        new = self.pm100usb.update_data()
+        stats = self.pm100usb.stats
+        # min/max of the last stats.window seconds, recorded or not
+        minmax = self.pm100usb.recent_minmax
+        if minmax is None:
+            minmax = (self.pm100usb.current_power, self.pm100usb.current_power)
         data = [self.pm100usb.current_power,
-                self.pm100usb.maxmin_power[0],\
-                self.pm100usb.maxmin_power[1],\
+                minmax[0],
+                minmax[1],
                 self.pm100usb.current_temp]
         self.contpanel.onUpdate( data)
+        self.contpanel.UpdateStatsPanel( stats.results())
+        if self.recorder is not None and self.recorder.error is not None:
+            self.onStopSaving( None)
         if self.pm100usb.recording:
             self.graphpanel.upDate()
+        elif new: # e.g. the last batch after a stop, keep the envelope current
+            self.graphpanel.updateMinMax()
+        if self.spectrumpanel is not None and self.spectrumpanel.isVisible():
+            self.spectrumpanel.upDate()
             
 if __name__ == '__main__':
+    if '--simulate' in sys.argv: # simulated devices instead of /dev/usbtmc*
+        import SimUSBTMC
+        SimUSBTMC.install()
+    attach = None
+    if '--attach' in sys.argv: # --attach file.pmb written by pm100usb_daemon
+        attach = sys.argv[sys.argv.index('--attach')+1]
+    devices = None
+    if '--devices' in sys.argv: # --devices /dev/usbtmc0,/dev/usbtmc1,...
+        devices = sys.argv[sys.argv.index('--devices')+1].split(',')
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     '''
@@ -759,6 +1149,6 @@ if __name__ == '__main__':
 
     app.setStyleSheet("QToolTip { color: #ffffff; background-color: #2a82da; border: 1px solid white; }")
     '''
-    frame=MainFrame()
+    frame=MainFrame(attach=attach, devices=devices)
     frame.show()
     sys.exit(app.exec_())
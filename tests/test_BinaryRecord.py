@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from BinaryRecord import BinaryFormat, BinaryReader
+from SampleStore import record_dtype
+
+
+def make_records(n, t0=1.7e9):
+    rec = np.zeros(n, dtype=record_dtype)
+    rec['time'] = t0 + 0.05*np.arange(n)
+    rec['mono'] = 100.0 + 0.05*np.arange(n)
+    rec['power'] = np.linspace(0.5, 1.5, n)
+    rec['temp'] = 25.0
+    return rec
+
+
+def write_file(filename, rec, batches=5, stats=None):
+    with open(filename, 'wb') as outFile:
+        writer = BinaryFormat(outFile)
+        writer.write_header(['test'], {'PERIOD': 0.05}, ['power'])
+        for part in np.array_split(rec, batches):
+            writer.write(0, part)
+        if stats is not None:
+            writer.write_stats(stats)
+
+
+def test_round_trip(tmp_path):
+    filename = str(tmp_path/'run.pmb')
+    rec = make_records(10000)
+    write_file(filename, rec, stats={'power': {'mean': 1.0}})
+    reader = BinaryReader(filename, step=64)
+    assert len(reader) == len(rec)
+    assert reader.header == ['test']
+    assert reader.meta['PERIOD'] == 0.05
+    assert reader.stats == {'power': {'mean': 1.0}}
+    assert reader.records.dtype == record_dtype
+    assert np.array_equal(reader.records, rec)
+
+
+def test_time_range_against_brute_force(tmp_path):
+    filename = str(tmp_path/'run.pmb')
+    rec = make_records(5000)
+    write_file(filename, rec)
+    reader = BinaryReader(filename, step=100)
+    rng = np.random.default_rng(9)
+    for _ in range(200):
+        a, b = np.sort(rng.uniform(rec['time'][0] - 10, rec['time'][-1] + 10, 2))
+        if rng.random() < 0.3:   # exactly on a record
+            a = rec['time'][rng.integers(len(rec))]
+        got = reader.time_range(a, b)
+        ref = rec[(rec['time'] >= a) & (rec['time'] <= b)]
+        assert np.array_equal(got, ref)
+
+
+def test_growing_file(tmp_path):
+    filename = str(tmp_path/'run.pmb')
+    rec = make_records(300)
+    outFile = open(filename, 'wb')
+    writer = BinaryFormat(outFile)
+    writer.write_header([], {}, ['power'])
+    writer.write(0, rec[:100])
+    outFile.flush()
+    reader = BinaryReader(filename)
+    assert len(reader) == 100
+    writer.write(100, rec[100:])
+    outFile.close()
+    reader.refresh()
+    assert np.array_equal(reader.records, rec)
+
+
+def test_not_a_binary_file(tmp_path):
+    filename = tmp_path/'run.txt'
+    filename.write_text('# text\n')
+    with pytest.raises(ValueError):
+        BinaryReader(str(filename))
@@ -0,0 +1,65 @@
+import math
+import numpy as np
+from RunningStats import SlidingMinMax, RunningStats
+
+
+def brute_minmax(values, pos, length):
+    # min/max of the values within length of each position
+    res = []
+    for i in range(len(values)):
+        w = [v for v,p in zip(values[:i+1], pos[:i+1]) if p > pos[i] - length]
+        res.append((min(w), max(w)))
+    return res
+
+
+def test_sliding_minmax_count():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=500).tolist()
+    mm = SlidingMinMax(17)
+    expected = brute_minmax(values, list(range(len(values))), 17)
+    for v,e in zip(values, expected):
+        mm.append(v)
+        assert (mm.min, mm.max) == e
+
+
+def test_sliding_minmax_time():
+    rng = np.random.default_rng(2)
+    values = rng.integers(0, 10, size=400).tolist()  # many equal values
+    pos = np.cumsum(rng.uniform(0.0, 0.5, size=400)).tolist()
+    mm = SlidingMinMax(3.0)
+    expected = brute_minmax(values, pos, 3.0)
+    for v,p,e in zip(values, pos, expected):
+        mm.append(v, p)
+        assert (mm.min, mm.max) == e
+
+
+def check_stats(stats, values, t, window):
+    v = np.asarray(values, dtype=np.float64)
+    x = np.asarray(t, dtype=np.float64)
+    assert stats.count == len(v)
+    assert math.isclose(stats.mean, v.mean(), rel_tol=1e-12)
+    assert math.isclose(stats.std, v.std(ddof=1), rel_tol=1e-9)
+    assert stats.min == v.min() and stats.max == v.max()
+    assert math.isclose(stats.drift, np.polyfit(x, v, 1)[0], rel_tol=1e-6)
+    w = v[x > x[-1] - window]
+    assert stats.minmax.min == w.min() and stats.minmax.max == w.max()
+
+
+def test_running_stats_append_and_extend():
+    rng = np.random.default_rng(3)
+    n = 2000
+    t = 1e9 + np.cumsum(rng.uniform(0.05, 0.15, size=n))  # epoch-like times
+    values = 1.0 + 0.01*rng.normal(size=n) + 1e-4*(t - t[0])
+    one = RunningStats(window=20.0)
+    for v,tt in zip(values, t):
+        one.append(float(v), float(tt))
+    check_stats(one, values, t, 20.0)
+    # the same samples in batches of varying size, with a gap (NaN)
+    batch = RunningStats(window=20.0)
+    gapped = values.copy()
+    gapped[100] = np.nan
+    bounds = [0, 1, 7, 300, 301, 1500, n]
+    for i0,i1 in zip(bounds[:-1], bounds[1:]):
+        batch.extend(gapped[i0:i1], t[i0:i1])
+    ok = np.isfinite(gapped)
+    check_stats(batch, values[ok], t[ok], 20.0)
@@ -0,0 +1,50 @@
+import numpy as np
+from Spectrum import WelchPSD
+
+
+def batch_welch(y, fs, nperseg, noverlap):
+    # Welch estimate of the whole record at once (periodic Hann window,
+    # constant detrend, one-sided density, mean of the segments)
+    step = nperseg - noverlap
+    window = np.hanning(nperseg + 1)[:-1]
+    scale = 1.0/(fs*(window**2).sum())
+    segments = [y[i:i+nperseg] for i in range(0, len(y) - nperseg + 1, step)]
+    p = []
+    for s in segments:
+        f = np.fft.rfft((s - s.mean())*window)
+        p.append(np.abs(f)**2*scale)
+    p = np.mean(p, axis=0)
+    p[1:-1] *= 2   # one-sided (nperseg even)
+    return np.fft.rfftfreq(nperseg, 1.0/fs), p, len(segments)
+
+
+def test_streaming_equals_batch():
+    rng = np.random.default_rng(7)
+    fs = 20.0
+    n = 5000
+    t = np.arange(n)/fs
+    y = 1.0 + 0.01*rng.normal(size=n) + 0.02*np.sin(2*np.pi*3.0*t)
+    welch = WelchPSD(fs, nperseg=256, noverlap=96)
+    for i0 in range(0, n, 123):   # blocks unrelated to the segments
+        welch.extend(y[i0:i0+123])
+    freq, psd = welch.psd()
+    ref_freq, ref, segments = batch_welch(y, fs, 256, 96)
+    assert welch.segments == segments
+    assert np.allclose(freq, ref_freq)
+    assert np.allclose(psd, ref, rtol=1e-9, atol=0)
+    # the sine is the peak, and the density integrates to the variance
+    assert abs(freq[np.argmax(psd[1:]) + 1] - 3.0) < fs/256
+    assert np.isclose(psd.sum()*fs/256, np.var(y), rtol=0.1)
+
+
+def test_exponential_average():
+    rng = np.random.default_rng(8)
+    y = rng.normal(size=64*10)
+    welch = WelchPSD(1.0, nperseg=64, noverlap=0, average='exp', memory=4)
+    welch.extend(y)
+    p = None
+    for i in range(10):
+        s = y[64*i:64*(i+1)]
+        ref = batch_welch(s, 1.0, 64, 0)[1]
+        p = ref if p is None else p + (ref - p)/4
+    assert np.allclose(welch.psd()[1], p, rtol=1e-9)
@@ -0,0 +1,54 @@
+import numpy as np
+from Stability import allan_deviation, modified_allan_deviation, stability
+
+
+def brute_adev(y, m):
+    # overlapping Allan deviation from the averages of m samples
+    n = len(y)
+    avg = np.array([y[i:i+m].mean() for i in range(n-m+1)])
+    d = avg[m:] - avg[:-m]
+    return np.sqrt(0.5*np.mean(d*d))
+
+
+def brute_mdev(y, m):
+    # modified Allan deviation from the phase x (integrated y)
+    x = np.concatenate(([0.0], np.cumsum(y)))
+    n = len(x)
+    terms = []
+    for j in range(n - 3*m + 1):
+        s = sum(x[i+2*m] - 2*x[i+m] + x[i] for i in range(j, j+m))
+        terms.append(s*s)
+    return np.sqrt(np.mean(terms)/(2.0*m**4))
+
+
+def test_allan_against_brute_force():
+    rng = np.random.default_rng(4)
+    y = 1.0 + 0.01*rng.normal(size=300) + 0.001*np.cumsum(rng.normal(size=300))
+    tau, adev, count = allan_deviation(y, 0.1)
+    assert list(tau) == [0.1*m for m in (1, 2, 4, 8, 16, 32, 64, 128)]
+    for m,a in zip((1, 2, 4, 8, 16, 32, 64, 128), adev):
+        assert np.isclose(a, brute_adev(y, m), rtol=1e-9)
+
+
+def test_modified_allan_against_brute_force():
+    rng = np.random.default_rng(5)
+    y = 1.0 + 0.01*rng.normal(size=200)
+    tau, mdev, count = modified_allan_deviation(y, 1.0)
+    assert list(tau) == [1, 2, 4, 8, 16, 32, 64]
+    for m,a in zip(tau.astype(int), mdev):
+        assert np.isclose(a, brute_mdev(y, m), rtol=1e-9)
+
+
+def test_blocks_chunks_and_gaps():
+    rng = np.random.default_rng(6)
+    y = 2.0 + 0.05*rng.normal(size=1000)
+    ref = stability(y, 0.5)
+    gapped = np.insert(y, [10, 500], np.nan)
+    blocks = [gapped[:333], gapped[333:334], gapped[334:]]
+    res = stability(blocks, 0.5)
+    for key in ('tau', 'adev', 'tau_mod', 'mdev'):
+        assert np.allclose(res[key], ref[key], rtol=1e-9)
+    # summed in chunks as in a recording too large for one pass
+    adev = allan_deviation(y, 0.5)[1]
+    assert np.allclose(allan_deviation(y, 0.5, chunk=7)[1], adev, rtol=1e-12)
+    assert np.allclose(ref['adev'], adev/y.mean(), rtol=1e-12)
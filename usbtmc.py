@@ -3,29 +3,121 @@
 #   https://pythonhosted.org/ThorlabsPM100/  by Pierre Clade.
 #   and have added a routine to get usbtmc devices and information
 #   v1.0 2020.11.25 Goro Nishimura
+#   v1.1 2026.10.18 other transports (e.g. simulated devices) can be plugged in
+#                   AsyncUSBTMC for asyncio (a worker thread per instrument)
+#                   devices are identified from sysfs without *RST, cached
+#                   preallocated reply buffer, query_float/query_floats
+#                   IEEE 488.2 definite-length blocks (read_block/query_array)
 #
 import os
 import glob
+import fcntl
+import struct
+import asyncio
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# ioctl of the Linux usbtmc driver: timeout of reads/writes in ms (u32)
+USBTMC_IOCTL_SET_TIMEOUT = (1<<30) | (4<<16) | (ord('[')<<8) | 10
+
+# device name prefix -> class used instead of USBTMC (see open_device)
+transports = {}
+# names of the devices of those transports, listed with /dev/usbtmc*
+extra_devices = []
 
 def list_devices():
     "List all connected USBTMC devices associated to /dev/usbtmc*"
-    return glob.glob("/dev/usbtmc*")
+    return glob.glob("/dev/usbtmc*") + extra_devices
+
+
+def open_device(device):
+    "Open a device with the transport registered for its name"
+    for prefix,cls in transports.items():
+        if device.startswith(prefix):
+            return cls(device)
+    return USBTMC(device)
 
 
-def list_devinfo():
-    "List info for all connected USBTMC devices"
-    res = []
+# USB vendor/product ids for sysfs entries without the name strings
+vendor_ids = {'1313': 'Thorlabs'}
+product_ids = {('1313', '8072'): 'PM100USB',
+               ('1313', '80f0'): 'TSP01', ('1313', '80fa'): 'TSP01'}
 
-    for dev in list_devices():
-        usbtmc_dev = USBTMC( dev)
-        usbtmc_dev.sendReset()
-        info = usbtmc_dev.getInfo()
-        dev_info = [dev]
-        dev_info += info[0].split(',')
-        res.append( dev_info)
-        usbtmc_dev.close()
+# device node -> (node identity, [dev, manufacturer, model, serial, version])
+devinfo_cache = {}
+
+
+def sysfs_devinfo(dev):
+    """Info of a /dev/usbtmc* device read from sysfs, without talking to
+    the instrument; None when sysfs does not describe it"""
+    path = os.path.join('/sys/class/usbmisc', os.path.basename(dev), 'device')
+    path = os.path.realpath(os.path.join(path, '..')) # interface -> device
+
+    def attr(name):
+        try:
+            with open(os.path.join(path, name)) as f:
+                return f.read().strip()
+        except OSError:
+            return ''
+
+    vendor, product = attr('idVendor'), attr('idProduct')
+    if not vendor:
+        return None
+    model = attr('product') or product_ids.get((vendor, product), product)
+    serial = attr('serial')
+    bcd = attr('bcdDevice')
+    version = '%d.%d' % (int(bcd[:2], 16), int(bcd[2:], 16)) if bcd else ''
+    manufacturer = attr('manufacturer') or vendor_ids.get(vendor, vendor)
+    return [dev, manufacturer, model, serial, version]
+
+
+def probe_devinfo(dev):
+    "Info of a device from its *IDN? reply (no *RST)"
+    try:
+        usbtmc_dev = open_device( dev)
+        try:
+            info = usbtmc_dev.getInfo()
+        finally:
+            usbtmc_dev.close()
+        return [dev] + info[0].split(',')
+    except (OSError, IndexError, TypeError):
+        return None
 
-    return res
+
+def node_id(dev):
+    "changes when the device node is created again (hotplug)"
+    try:
+        st = os.stat(dev)
+        return (st.st_ino, st.st_ctime_ns, st.st_rdev)
+    except OSError:
+        return dev    # not a file (other transports)
+
+
+def list_devinfo(probe=True, refresh=False):
+    """List info for all connected USBTMC devices.  Devices are identified
+    from sysfs; the others are asked *IDN? in parallel when probe is True.
+    Results are cached until the device node is replaced or refresh."""
+    devs = list_devices()
+    ids = {dev: node_id(dev) for dev in devs}
+    for dev in list(devinfo_cache):
+        if refresh or devinfo_cache[dev][0] != ids.get(dev):
+            del devinfo_cache[dev]
+
+    todo = []
+    for dev in devs:
+        if dev not in devinfo_cache:
+            info = sysfs_devinfo(dev)
+            if info is not None:
+                devinfo_cache[dev] = (ids[dev], info)
+            else:
+                todo.append(dev)
+    if probe and todo:
+        with ThreadPoolExecutor(max_workers=len(todo)) as pool:
+            for dev,info in zip(todo, pool.map(probe_devinfo, todo)):
+                if info is not None:
+                    devinfo_cache[dev] = (ids[dev], info)
+
+    return [devinfo_cache[dev][1] for dev in devs if dev in devinfo_cache]
 
 def find_device(Product=None, iSerial=None):
     "Find USBTMC instrument"
@@ -61,16 +153,45 @@ def find_device(Product=None, iSerial=None):
 class USBTMC(object):
     """Simple implementation of a USBTMC device driver, in the style of visa.h
     """
+    read_size = 4000   # bytes of the reply buffer
+    number_size = 256  # bytes of the buffer of the numeric replies
+    transfer_size = 1<<16  # bytes per read of a long block
+    separators = bytes.maketrans(b';', b',')
 
     def __init__(self, device="/dev/usbtmc0"):
         self.device = device
+        self.init_buffers()
         try:
             self.FILE = os.open(device, os.O_RDWR)
         except OSError:
             self.FILE = None
 
+    def init_buffers(self):
+        # replies are read into this buffer (no allocation per read)
+        self.buf = bytearray(self.read_size)
+        self.view = memoryview(self.buf)
+        # numeric replies are read into a blank-padded buffer that float()
+        # parses in place (trailing blanks are ignored), then blanked again
+        self.number = bytearray(b' ' * self.number_size)
+        self.number_view = memoryview(self.number)
+        self.blank = memoryview(b' ' * self.number_size)
+        self.encoded = {}  # command -> bytes, for the repeated queries
+        self.block = bytearray(0)  # data of the binary blocks, grows as needed
+
+    def encode(self, command):
+        cmd = self.encoded.get(command)
+        if cmd is None:
+            cmd = command.encode('ascii')
+            if len(self.encoded) < 256:
+                self.encoded[command] = cmd
+        return cmd
+
     def write(self, command):
-        os.write(self.FILE, command.encode('ascii'))
+        os.write(self.FILE, self.encode(command))
+
+    def read_into(self, view=None):
+        "read a reply into self.buf (or view) and return its length"
+        return os.readv(self.FILE, [self.view if view is None else view])
 
     def read(self, length=None):
         if length is None:
@@ -81,8 +202,101 @@ class USBTMC(object):
         self.write(command)
         return self.read(length=length).decode('ascii').splitlines()
 
+    def read_number(self, command):
+        # length of the reply in self.number
+        self.write(command)
+        n = self.read_into(self.number_view)
+        if n >= self.number_size:
+            self.clear_number(n)
+            raise ValueError('numeric reply too long')
+        return n
+
+    def clear_number(self, n):
+        self.number_view[:n] = self.blank[:n]
+
+    def query_float(self, command):
+        "numeric reply, parsed in the buffer (no copy, no decoding)"
+        n = self.read_number(command)
+        try:
+            return float(self.number)
+        finally:
+            self.clear_number(n)
+
+    def query_floats(self, command):
+        """numbers of a reply separated by ',' or ';' (e.g. joined queries);
+        the fields are split off the buffer, one small bytes per value"""
+        n = self.read_number(command)
+        try:
+            return [float(v) for v in
+                    self.number.translate(self.separators).split(b',')]
+        finally:
+            self.clear_number(n)
+
     def ask_for_value(self, command):
-        return eval(self.ask(command).strip())
+        "numeric reply as int or float"
+        self.write(command)
+        n = self.read_into()
+        res = bytes(self.buf[:n]).strip()
+        try:
+            return int(res)
+        except ValueError:
+            return float(res)
+
+    def read_block(self, out=None):
+        """read a definite-length block '#<n><length><data>', reassembled from
+        as many reads as needed directly into out (a writable buffer) or into
+        self.block.  Returns a memoryview of the data, valid until the next
+        block when it is in self.block."""
+        n = self.read_into()
+        buf = self.buf
+        if n < 2 or buf[0] != 0x23:  # '#'
+            raise IOError('not a binary block: '+repr(bytes(buf[:min(n, 20)])))
+        digits = buf[1] - 0x30
+        if digits < 1 or digits > 9:
+            raise IOError('indefinite-length block not supported')
+        start = 2 + digits
+        while n < start:
+            n += self.read_into(self.view[n:])
+        length = int(buf[2:start])
+        if out is None:
+            # one byte more for the terminator of the last read
+            if len(self.block) < length + 1:
+                self.block = bytearray(length + 1)
+            out = self.block
+        data = memoryview(out).cast('B')
+        if len(data) < length:
+            raise ValueError('buffer too small for %d bytes' % length)
+        got = min(n - start, length)
+        data[:got] = self.view[start:start+got]
+        end = n > start + length   # terminator read
+        while got < length:
+            size = min(length - got, self.transfer_size)
+            if got + size == length and len(data) > length:
+                size += 1   # the terminator, when it comes with the data
+            k = self.read_into(data[got:got+size])
+            if k == 0:
+                raise IOError('block ended after %d of %d bytes' % (got, length))
+            got += k
+            end = got > length
+        if not end:
+            self.read_into(self.view[:1])
+        return data[:length]
+
+    def query_block(self, command, out=None):
+        self.write(command)
+        return self.read_block(out)
+
+    def query_array(self, command, dtype='<f4', out=None):
+        """numpy array of a binary block reply, sharing the memory of the
+        block (pass out, e.g. an array, to keep it)"""
+        data = self.query_block(command, out)
+        dtype = np.dtype(dtype)
+        return np.frombuffer(data, dtype=dtype, count=len(data)//dtype.itemsize)
+
+    def set_timeout(self, seconds):
+        "timeout of the driver for each read and write (at least 0.1 s)"
+        ms = max(int(seconds*1000), 100)
+        fcntl.ioctl(self.FILE, USBTMC_IOCTL_SET_TIMEOUT, struct.pack('I', ms))
 
     def getInfo(self):
         return self.query("*IDN?")
@@ -93,5 +307,93 @@ class USBTMC(object):
     def close(self):
         os.close(self.FILE)
 
+
+class AsyncUSBTMC(object):
+    """asyncio version of USBTMC.  The usbtmc driver reads and writes
+    synchronously (O_NONBLOCK is ignored and poll does not report a
+    reply), so every instrument gets its own worker thread, and the event
+    loop thread only awaits the results: many instruments can be served
+    from one thread.  Queries of one instrument run one after the other in
+    the order they were issued.  Each one has a timeout, which is also set
+    as the timeout of the driver so that the read of the worker ends with
+    it, and can be cancelled (the worker still takes the reply)."""
+
+    def __init__(self, device="/dev/usbtmc0", timeout=5.0):
+        self.device = device
+        self.timeout = timeout   # seconds per query (None: wait forever)
+        self.worker = ThreadPoolExecutor(max_workers=1)
+        self.driver_timeout = None
+        self.dev = open_device(device)
+        if not self.dev.FILE:
+            self.dev = None
+
+    @property
+    def active(self):
+        return self.dev is not None
+
+    def set_timeout(self, timeout):
+        # in the worker
+        if timeout is not None and timeout != self.driver_timeout:
+            try:
+                self.dev.set_timeout(timeout)
+            except OSError:
+                pass  # driver without the ioctl: its own timeout (5 s)
+            self.driver_timeout = timeout
+
+    def transaction(self, command, length, timeout):
+        # in the worker: the reply is read even after a cancel
+        self.set_timeout(timeout)
+        self.dev.write(command)
+        if length is None:
+            return None
+        return self.dev.read(length)
+
+    async def run(self, command, length, timeout):
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.worker, self.transaction,
+                                      command, length, timeout)
+        return await asyncio.wait_for(future, timeout)
+
+    async def write(self, command, timeout=None):
+        await self.run(command, None, timeout)
+
+    async def query_raw(self, command, length=4000, timeout=None):
+        "reply as bytes"
+        return await self.run(command, length, timeout)
+
+    async def query(self, command, length=4000, timeout=None):
+        res = await self.query_raw(command, length, timeout)
+        return res.decode('ascii').splitlines()
+
+    async def query_float(self, command, timeout=None):
+        "numeric reply, parsed without decoding"
+        return float(await self.query_raw(command, timeout=timeout))
+
+    async def query_floats(self, command, timeout=None):
+        "numbers of a reply separated by ',' or ';' (e.g. joined queries)"
+        res = await self.query_raw(command, timeout=timeout)
+        return [float(v) for v in
+                res.translate(USBTMC.separators).split(b',')]
+
+    async def query_many(self, commands, timeout=None):
+        """pipelined queries: sent as one ';'-joined message, the replies
+        are returned as a list"""
+        res = await self.query(';'.join(commands), timeout=timeout)
+        return ';'.join(res).split(';')
+
+    async def getInfo(self):
+        return await self.query("*IDN?")
+
+    async def sendReset(self):
+        await self.write("*RST")
+
+    def close(self):
+        if self.dev is not None:
+            dev, self.dev = self.dev, None
+            # after the queries still running in the worker
+            self.worker.submit(dev.close)
+        self.worker.shutdown(wait=False)
+
 if __name__ == "__main__":
     inst = USBTMC()